@@ -21,18 +21,29 @@ Usage:
 """
 
 import argparse
+import copy
+import hashlib
 import json
 import os
 import sys
 import random
+from functools import lru_cache
+from itertools import accumulate, islice
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
-from collections import defaultdict
+from typing import Callable, List, Tuple, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from PIL import Image
 from tqdm import tqdm
 
+# Optional: KD-tree for nearest-color lookup in large tile pools
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
 
 # =============================================================================
 # Constants
@@ -41,16 +52,48 @@ from tqdm import tqdm
 DEFAULT_TILE_SIZE = 40       # Size of each tile in final mosaic
 DEFAULT_OUTPUT = "mosaic.png"
 SUPPORTED_FORMATS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
+TILE_CACHE_DIR = Path.home() / ".cache" / "pod-lists"
+TILE_CACHE_VERSION = 2       # Bump when tile preparation changes
+
+# Tile resize filters. BOX is much cheaper than LANCZOS and looks the same
+# once album art is shrunk to a small mosaic tile.
+RESAMPLE_FILTERS = {
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+SMALL_TILE_MAX = 64          # "auto" uses BOX at or below this tile size, LANCZOS above
+KDTREE_MIN_TILES = 256       # Below this a vectorized scan beats building a KD-tree
+RECENT_USAGE_WINDOW = 100    # Most recent positions remembered per tile for min-distance checks
+COLOR_SPACES = ("rgb", "lab")  # Color space tile matching measures distance in
 
 
 # =============================================================================
 # Image Processing
 # =============================================================================
 
-def load_and_prepare_tile(path: Path, tile_size: int) -> Optional[np.ndarray]:
+def resolve_resample(name: str, tile_size: int) -> Image.Resampling:
+    """Map a resample name ("auto", "box", "bilinear", "lanczos") to a PIL filter."""
+    if name == "auto":
+        name = "box" if tile_size <= SMALL_TILE_MAX else "lanczos"
+    return RESAMPLE_FILTERS[name]
+
+
+def load_and_prepare_tile(
+    path: Path,
+    tile_size: int,
+    resample: Optional[Image.Resampling] = None,
+) -> Optional[np.ndarray]:
     """Load an image, crop to square, resize to tile_size."""
+    if resample is None:
+        resample = resolve_resample("auto", tile_size)
+
     try:
-        img = Image.open(path).convert("RGB")
+        img = Image.open(path)
+        # JPEGs can decode at 1/2, 1/4 or 1/8 scale; keep at least 2x the tile
+        # size so the final resize still has detail to work with (no-op for other formats)
+        img.draft("RGB", (tile_size * 2, tile_size * 2))
+        img = img.convert("RGB")
     except Exception as e:
         return None
 
@@ -62,26 +105,49 @@ def load_and_prepare_tile(path: Path, tile_size: int) -> Optional[np.ndarray]:
     img = img.crop((left, top, left + min_dim, top + min_dim))
 
     # Resize to tile size
-    img = img.resize((tile_size, tile_size), Image.Resampling.LANCZOS)
+    img = img.resize((tile_size, tile_size), resample)
 
-    return np.array(img)
+    return np.asarray(img)
 
 
-def get_average_color(img: np.ndarray) -> Tuple[int, int, int]:
-    """Calculate average RGB color of an image."""
-    avg = img.mean(axis=(0, 1))
-    return tuple(int(c) for c in avg)
+def _sq_color_distance(c1: Tuple[int, int, int], c2: Tuple[int, int, int]) -> int:
+    """Squared Euclidean distance between two colors (same ordering, no sqrt)."""
+    return (c1[0] - c2[0]) ** 2 + (c1[1] - c2[1]) ** 2 + (c1[2] - c2[2]) ** 2
 
 
-def color_distance(c1: Tuple[int, int, int], c2: Tuple[int, int, int]) -> float:
-    """Calculate Euclidean distance between two colors."""
-    return sum((a - b) ** 2 for a, b in zip(c1, c2)) ** 0.5
+def compute_cell_averages(img: np.ndarray, grid_w: int, grid_h: int, cell_size: int) -> np.ndarray:
+    """
+    Average color of every grid cell in one pass.
+
+    Returns a (grid_h, grid_w, 3) uint8 array: the mean RGB of each
+    cell_size x cell_size block, truncated to integers.
+    """
+    cells = img[:grid_h * cell_size, :grid_w * cell_size]
+    cells = cells.reshape(grid_h, cell_size, grid_w, cell_size, 3)
+    return cells.mean(axis=(1, 3)).astype(np.uint8)
 
 
-def get_region_average(img: np.ndarray, x: int, y: int, w: int, h: int) -> Tuple[int, int, int]:
-    """Get average color of a region in an image."""
-    region = img[y:y+h, x:x+w]
-    return get_average_color(region)
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert 0-255 sRGB colors (any leading shape, last axis RGB) to CIELAB
+    (D65 white), as float32. Euclidean distance in LAB approximates
+    perceived color difference (CIE76 delta E).
+    """
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    # sRGB gamma -> linear light
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= (0.95047, 1.0, 1.08883)
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    lab = np.empty_like(f)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab.astype(np.float32)
 
 
 def parse_hex_color(hex_str: str) -> Optional[Tuple[int, int, int]]:
@@ -136,67 +202,193 @@ def apply_tint(
     - color: Applies tint hue/saturation while preserving tile luminosity.
 
     Args:
-        tile: RGB tile array
+        tile: RGB tile array (any leading dims, channels last)
         tint_color: RGB tint color
         alpha: Blend strength (0.0-1.0)
         blend_mode: One of "normal", "multiply", "screen", "overlay", "soft_light", "color"
     """
-    tile_float = tile.astype(np.float32) / 255.0
-    tint_norm = np.array(tint_color, dtype=np.float32) / 255.0
+    return make_tint_fn(tint_color, alpha, blend_mode)(tile)
 
-    if blend_mode == "normal":
-        # Simple alpha blend
-        result = (1 - alpha) * tile_float + alpha * tint_norm
 
-    elif blend_mode == "multiply":
+def make_tint_fn(
+    tint_color: Tuple[int, int, int],
+    alpha: float,
+    blend_mode: str = "normal"
+) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Build a tint function specialized for one tint color, alpha and blend mode.
+
+    The blend mode is resolved and the tint-only terms are computed once, so
+    repeated calls (e.g. per cell in region-tint mode) only do per-pixel math.
+    Blend math is done in place on at most two float32 buffers per call
+    (the tile and the blend layer) instead of a fresh temporary per operation.
+    """
+    tint_norm = np.array(tint_color, dtype=np.float32) / 255.0
+    one_minus_alpha = 1 - alpha
+
+    def to_float(tile: np.ndarray) -> np.ndarray:
+        tile_float = tile.astype(np.float32)
+        tile_float /= 255.0
+        return tile_float
+
+    def finish(tile_float: np.ndarray, blended: np.ndarray) -> np.ndarray:
+        # result = (1-alpha)*tile + alpha*blended, scaled back to uint8
+        blended *= alpha
+        tile_float *= one_minus_alpha
+        tile_float += blended
+        tile_float *= 255
+        np.clip(tile_float, 0, 255, out=tile_float)
+        return tile_float.astype(np.uint8)
+
+    if blend_mode == "multiply":
         # Multiply: result = base * blend (darkens)
-        multiplied = tile_float * tint_norm
-        result = (1 - alpha) * tile_float + alpha * multiplied
+        def tint_multiply(tile):
+            tile_float = to_float(tile)
+            return finish(tile_float, tile_float * tint_norm)
+        return tint_multiply
 
     elif blend_mode == "screen":
         # Screen: result = 1 - (1-base)*(1-blend) (lightens)
-        screened = 1 - (1 - tile_float) * (1 - tint_norm)
-        result = (1 - alpha) * tile_float + alpha * screened
+        inv_tint = 1 - tint_norm
+
+        def tint_screen(tile):
+            tile_float = to_float(tile)
+            blended = np.subtract(1, tile_float)
+            blended *= inv_tint
+            np.subtract(1, blended, out=blended)
+            return finish(tile_float, blended)
+        return tint_screen
 
     elif blend_mode == "overlay":
         # Overlay: multiply darks, screen lights
         # if base < 0.5: 2*base*blend, else: 1 - 2*(1-base)*(1-blend)
-        dark_mask = tile_float < 0.5
-        overlayed = np.where(
-            dark_mask,
-            2 * tile_float * tint_norm,
-            1 - 2 * (1 - tile_float) * (1 - tint_norm)
-        )
-        result = (1 - alpha) * tile_float + alpha * overlayed
+        inv_tint = 1 - tint_norm
+
+        def tint_overlay(tile):
+            tile_float = to_float(tile)
+            blended = np.subtract(1, tile_float)
+            blended *= 2
+            blended *= inv_tint
+            np.subtract(1, blended, out=blended)
+            dark = tile_float * 2
+            dark *= tint_norm
+            np.copyto(blended, dark, where=tile_float < 0.5)
+            return finish(tile_float, blended)
+        return tint_overlay
 
     elif blend_mode == "soft_light":
         # Soft light: gentler version of overlay
         # Formula: (1-2*blend)*base^2 + 2*blend*base
-        soft = (1 - 2 * tint_norm) * (tile_float ** 2) + 2 * tint_norm * tile_float
-        result = (1 - alpha) * tile_float + alpha * soft
+        square_weight = 1 - 2 * tint_norm
+        linear_weight = 2 * tint_norm
+
+        def tint_soft_light(tile):
+            tile_float = to_float(tile)
+            blended = np.square(tile_float)
+            blended *= square_weight
+            blended += linear_weight * tile_float
+            return finish(tile_float, blended)
+        return tint_soft_light
 
     elif blend_mode == "color":
         # Color mode: apply tint hue/saturation, keep tile luminosity
-        # Convert both to HSL, take H/S from tint, L from tile
-        tile_lum = 0.299 * tile_float[:,:,0] + 0.587 * tile_float[:,:,1] + 0.114 * tile_float[:,:,2]
         tint_lum = 0.299 * tint_norm[0] + 0.587 * tint_norm[1] + 0.114 * tint_norm[2]
 
-        # Scale tint to match tile luminosity
-        if tint_lum > 0.001:
-            scale = tile_lum[:,:,np.newaxis] / tint_lum
-            colored = tint_norm * scale
-            colored = np.clip(colored, 0, 1)
-        else:
-            # Tint is too dark, just use luminosity
-            colored = np.stack([tile_lum, tile_lum, tile_lum], axis=2)
+        def tint_color_mode(tile):
+            tile_float = to_float(tile)
+            tile_lum = 0.299 * tile_float[..., 0] + 0.587 * tile_float[..., 1] + 0.114 * tile_float[..., 2]
+
+            # Scale tint to match tile luminosity
+            if tint_lum > 0.001:
+                blended = tint_norm * (tile_lum[..., np.newaxis] / tint_lum)
+                np.clip(blended, 0, 1, out=blended)
+            else:
+                # Tint is too dark, just use luminosity
+                blended = np.stack([tile_lum, tile_lum, tile_lum], axis=-1)
+            return finish(tile_float, blended)
+        return tint_color_mode
+
+    # normal (and unknown modes): simple alpha blend toward the tint color
+    tint_scaled = tint_norm * alpha
+
+    def tint_normal(tile):
+        tile_float = to_float(tile)
+        tile_float *= one_minus_alpha
+        tile_float += tint_scaled
+        tile_float *= 255
+        np.clip(tile_float, 0, 255, out=tile_float)
+        return tile_float.astype(np.uint8)
+    return tint_normal
+
+
+def apply_cheat_blend(
+    base: np.ndarray,
+    overlay: np.ndarray,
+    alpha: float,
+    blend_mode: str = "normal"
+) -> np.ndarray:
+    """
+    Blend a full-size overlay image (the target) onto the mosaic.
 
-        result = (1 - alpha) * tile_float + alpha * colored
+    Same blend modes as apply_tint, but with a per-pixel overlay instead of
+    a solid color. Works in place on two image-sized float32 buffers (plus
+    one scratch buffer for overlay/soft_light) rather than a temporary per op.
 
-    else:
-        # Unknown mode, fallback to normal
-        result = (1 - alpha) * tile_float + alpha * tint_norm
+    Args:
+        base: RGB mosaic array
+        overlay: RGB target array, same shape as base
+        alpha: Blend strength (0.0-1.0)
+        blend_mode: One of "normal", "multiply", "screen", "overlay", "soft_light", "color"
+    """
+    base_float = base.astype(np.float32)
+    base_float /= 255.0
+    blended = overlay.astype(np.float32)
+    blended /= 255.0
 
-    return np.clip(result * 255, 0, 255).astype(np.uint8)
+    if blend_mode == "multiply":
+        blended *= base_float
+
+    elif blend_mode == "screen":
+        np.subtract(1, blended, out=blended)
+        blended *= 1 - base_float
+        np.subtract(1, blended, out=blended)
+
+    elif blend_mode == "overlay":
+        dark = base_float * 2
+        dark *= blended
+        np.subtract(1, blended, out=blended)
+        light = np.subtract(1, base_float)
+        light *= 2
+        blended *= light
+        np.subtract(1, blended, out=blended)
+        np.copyto(blended, dark, where=base_float < 0.5)
+
+    elif blend_mode == "soft_light":
+        # (1-2*overlay)*base^2 + 2*overlay*base
+        blended *= 2
+        soft = blended * base_float
+        np.subtract(1, blended, out=blended)
+        blended *= np.square(base_float)
+        blended += soft
+
+    elif blend_mode == "color":
+        # Apply overlay hue/saturation, keep base luminosity
+        base_lum = 0.299 * base_float[:,:,0] + 0.587 * base_float[:,:,1] + 0.114 * base_float[:,:,2]
+        overlay_lum = 0.299 * blended[:,:,0] + 0.587 * blended[:,:,1] + 0.114 * blended[:,:,2]
+        np.maximum(overlay_lum, 0.001, out=overlay_lum)
+        base_lum /= overlay_lum
+        blended *= base_lum[:,:,np.newaxis]
+        np.clip(blended, 0, 1, out=blended)
+
+    # normal (and unknown modes) blend toward the overlay as-is
+
+    # result = (1-alpha)*base + alpha*blended, scaled back to uint8
+    blended *= alpha
+    base_float *= 1 - alpha
+    base_float += blended
+    base_float *= 255
+    np.clip(base_float, 0, 255, out=base_float)
+    return base_float.astype(np.uint8)
 
 
 # =============================================================================
@@ -223,16 +415,41 @@ def classify_region(
     """
     best_match = None
     best_distance = float('inf')
+    max_distance = tolerance * tolerance
 
     for region_name, region_color in REGION_COLORS.items():
-        dist = color_distance(cell_color, region_color)
-        if dist < best_distance and dist < tolerance:
+        dist = _sq_color_distance(cell_color, region_color)
+        if dist == 0 and max_distance > 0:
+            # Exact match (common for solid logo backgrounds) can't be beaten
+            return region_name
+        if dist < best_distance and dist < max_distance:
             best_distance = dist
             best_match = region_name
 
     return best_match
 
 
+def classify_regions(
+    cell_colors: np.ndarray,
+    tolerance: int = 80
+) -> np.ndarray:
+    """
+    Vectorized classify_region over an array of colors (e.g. every grid cell).
+
+    Returns an object array of the same leading shape holding region names,
+    or None where there is no clear match.
+    """
+    region_names = np.array(list(REGION_COLORS.keys()) + [None], dtype=object)
+    region_arr = np.array(list(REGION_COLORS.values()), dtype=np.int32)
+
+    # (..., num_regions) squared distances; argmin picks the first region on ties
+    diff = cell_colors.astype(np.int32)[..., np.newaxis, :] - region_arr
+    sq_distances = np.einsum('...ij,...ij->...i', diff, diff)
+    best = sq_distances.argmin(axis=-1)
+    best[sq_distances.min(axis=-1) >= tolerance * tolerance] = len(REGION_COLORS)
+    return region_names[best]
+
+
 def get_region_tint(
     region: str,
     region_tints: Dict[str, Tuple[int, int, int]]
@@ -334,17 +551,43 @@ def is_background_cell(
     region = img[y:y+h, x:x+w]
     total_pixels = region.shape[0] * region.shape[1]
 
-    # Calculate distance of each pixel to background color
-    bg_array = np.array(bg_color)
-    distances = np.sqrt(np.sum((region.astype(float) - bg_array) ** 2, axis=2))
+    # Squared distance of each pixel to background color (int32 is exact, no sqrt needed)
+    diff = region.astype(np.int32) - np.array(bg_color, dtype=np.int32)
+    sq_distances = (diff * diff).sum(axis=2)
 
     # Count pixels within tolerance
-    matching_pixels = np.sum(distances <= tolerance)
+    matching_pixels = np.count_nonzero(sq_distances <= tolerance * tolerance)
     match_ratio = matching_pixels / total_pixels
 
     return match_ratio >= threshold
 
 
+def compute_background_mask(
+    img: np.ndarray,
+    grid_w: int, grid_h: int, cell_size: int,
+    bg_color: Tuple[int, int, int],
+    threshold: float = 0.7,
+    tolerance: int = 30,
+) -> np.ndarray:
+    """
+    Classify every grid cell as background in one vectorized pass.
+
+    Same test as is_background_cell, but the per-pixel match map is computed
+    once for the whole image and reduced per cell with a block sum.
+
+    Returns:
+        (grid_h, grid_w) boolean array, True where the cell is background
+    """
+    region = img[:grid_h * cell_size, :grid_w * cell_size].astype(np.int32)
+    diff = region - np.array(bg_color, dtype=np.int32)
+    matching = (diff * diff).sum(axis=2) <= tolerance * tolerance
+
+    matching_pixels = matching.reshape(grid_h, cell_size, grid_w, cell_size).sum(axis=(1, 3))
+    match_ratio = matching_pixels / (cell_size * cell_size)
+
+    return match_ratio >= threshold
+
+
 # =============================================================================
 # Tile Pool
 # =============================================================================
@@ -368,23 +611,33 @@ class TilePool:
         min_reuse_distance: int = 5,
         max_reuse: int = 0,  # 0 = unlimited
         diversity_weight: float = 0.0,  # 0 = pure color match, higher = more variety
+        use_cache: bool = True,
+        resample: str = "auto",
+        color_space: str = "rgb",
     ):
         self.tile_size = tile_size
+        self.color_space = color_space
+        self.use_cache = use_cache
+        self.resample = resolve_resample(resample, tile_size)
         self.allow_reuse = allow_reuse
         self.min_reuse_distance = min_reuse_distance
         self.max_reuse = max_reuse
         self.diversity_weight = diversity_weight
 
-        self.tiles: List[np.ndarray] = []
-        self.colors: List[Tuple[int, int, int]] = []
+        # All tiles as one contiguous (N, T, T, 3) uint8 array; tiles[i] is a view
+        self.tiles = np.empty((0, tile_size, tile_size, 3), dtype=np.uint8)
+        self.colors = np.empty((0, 3), dtype=np.int16)   # (N, 3) average RGB per tile
         self.names: List[str] = []
 
-        # Track usage positions and counts for reuse control
-        self.recent_usage: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
-        self.usage_count: Dict[int, int] = defaultdict(int)
-
         self._load_tiles(tiles_dir)
 
+        # Track usage positions and counts for reuse control.
+        # recent_positions is a per-tile ring buffer of (x, y) grid positions;
+        # unused slots sit far off-grid so they never fail a distance check.
+        self.usage_count = np.zeros(len(self.tiles), dtype=np.int32)
+        self.recent_positions = np.full((len(self.tiles), RECENT_USAGE_WINDOW, 2), -10**6, dtype=np.int32)
+        self.recent_head = np.zeros(len(self.tiles), dtype=np.int32)
+
     def _load_tiles(self, tiles_dir: str):
         """Load all tiles from directory."""
         tiles_path = Path(tiles_dir)
@@ -400,14 +653,38 @@ class TilePool:
         if not image_files:
             raise ValueError(f"No image files found in {tiles_dir}")
 
-        print(f"Loading {len(image_files)} tile images...")
+        cache_key = self._cache_key(tiles_path, image_files) if self.use_cache else None
 
-        for path in tqdm(image_files, desc="Loading tiles"):
-            tile = load_and_prepare_tile(path, self.tile_size)
-            if tile is not None:
-                self.tiles.append(tile)
-                self.colors.append(get_average_color(tile))
-                self.names.append(path.name)
+        if cache_key and self._load_cache(cache_key):
+            print(f"Loaded {len(self.tiles)} tiles from cache ({TILE_CACHE_DIR})")
+        else:
+            print(f"Loading {len(image_files)} tile images...")
+
+            # PIL releases the GIL while decoding and resizing, so threads scale across cores;
+            # 2x oversubscription keeps cores busy while other threads wait on disk reads
+            with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as executor:
+                loaded = list(tqdm(
+                    executor.map(lambda p: load_and_prepare_tile(p, self.tile_size, self.resample), image_files),
+                    total=len(image_files),
+                    desc="Loading tiles",
+                ))
+
+            valid = [(path, tile) for path, tile in zip(image_files, loaded) if tile is not None]
+            if valid:
+                self.tiles = np.stack([tile for _, tile in valid])
+            # Average color of every tile in one pass (truncated to integers)
+            self.colors = self.tiles.mean(axis=(1, 2)).astype(np.int16)
+            self.names = [path.name for path, _ in valid]
+
+            if cache_key and valid:
+                self._save_cache(cache_key)
+
+        # Average colors as one (N, 3) array so matching is a single vectorized pass,
+        # converted once to the color space distances are measured in
+        self.colors_arr = self.to_match_space(self.colors)
+        self.color_tree = None
+        if HAS_SCIPY and len(self.tiles) >= KDTREE_MIN_TILES:
+            self.color_tree = cKDTree(self.colors_arr)
 
         print(f"Loaded {len(self.tiles)} valid tiles")
 
@@ -418,6 +695,51 @@ class TilePool:
         # For random mode: track unused tiles
         self.unused_tiles = set(range(len(self.tiles)))
 
+    def _cache_key(self, tiles_path: Path, image_files: List[Path]) -> str:
+        """Cache key for prepared tiles: changes when files are added, removed, or modified."""
+        newest = max(f.stat().st_mtime for f in image_files)
+        key = (f"{TILE_CACHE_VERSION}:{tiles_path.resolve()}:{self.tile_size}:{self.resample.name}:"
+               f"{len(image_files)}:{newest}")
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def _load_cache(self, cache_key: str) -> bool:
+        """Load prepared tiles from the disk cache. Returns False on a miss."""
+        tiles_file = TILE_CACHE_DIR / f"tiles_{cache_key}.npy"
+        meta_file = TILE_CACHE_DIR / f"tiles_{cache_key}.npz"
+        if not (tiles_file.exists() and meta_file.exists()):
+            return False
+
+        try:
+            # Memory-mapped so tile pixels are paged in lazily
+            tiles = np.load(tiles_file, mmap_mode="r")
+            with np.load(meta_file) as meta:
+                colors = meta["colors"]
+                names = meta["names"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"WARNING: Ignoring unreadable tile cache: {e}", file=sys.stderr)
+            return False
+
+        self.tiles = tiles
+        self.colors = colors
+        self.names = [str(name) for name in names]
+        return True
+
+    def _save_cache(self, cache_key: str):
+        """Write prepared tiles to the disk cache (best effort)."""
+        try:
+            TILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            np.savez(
+                TILE_CACHE_DIR / f"tiles_{cache_key}.npz",
+                colors=self.colors,
+                names=np.asarray(self.names),
+            )
+            # Write tiles last: its presence marks the cache entry as complete
+            tmp_file = TILE_CACHE_DIR / f"tiles_{cache_key}.tmp.npy"
+            np.save(tmp_file, self.tiles)
+            os.replace(tmp_file, TILE_CACHE_DIR / f"tiles_{cache_key}.npy")
+        except OSError as e:
+            print(f"WARNING: Could not write tile cache: {e}", file=sys.stderr)
+
     def find_random_tile(self, position: Tuple[int, int]) -> np.ndarray:
         """
         Pick a random tile, respecting reuse constraints.
@@ -426,10 +748,8 @@ class TilePool:
         # First, try to pick from unused tiles
         if self.unused_tiles:
             # Filter unused tiles by position constraints
-            valid_unused = [
-                idx for idx in self.unused_tiles
-                if self._is_valid_position(idx, position)
-            ]
+            unused = np.fromiter(self.unused_tiles, dtype=np.intp, count=len(self.unused_tiles))
+            valid_unused = unused[self._valid_mask(unused, position)].tolist()
             if valid_unused:
                 tile_idx = random.choice(valid_unused)
                 self.unused_tiles.discard(tile_idx)
@@ -437,10 +757,8 @@ class TilePool:
                 return self.tiles[tile_idx]
 
         # All tiles used at least once, find any valid tile
-        valid_tiles = [
-            idx for idx in range(len(self.tiles))
-            if self._is_valid_position(idx, position)
-        ]
+        all_tiles = np.arange(len(self.tiles))
+        valid_tiles = all_tiles[self._valid_mask(all_tiles, position)].tolist()
 
         if valid_tiles:
             tile_idx = random.choice(valid_tiles)
@@ -448,103 +766,221 @@ class TilePool:
             return self.tiles[tile_idx]
 
         # Fallback: least-used tile
-        least_used_idx = min(range(len(self.tiles)), key=lambda i: self.usage_count[i])
+        least_used_idx = int(np.argmin(self.usage_count))
         self._record_usage(least_used_idx, position)
         return self.tiles[least_used_idx]
 
     def find_best_match(
         self,
-        target_color: Tuple[int, int, int],
+        target_color: np.ndarray,
         position: Tuple[int, int],
         top_n: int = 10,
         randomize: bool = True,
+        nearest: Optional[np.ndarray] = None,
     ) -> np.ndarray:
         """
-        Find the best matching tile for a target color.
+        Find the best matching tile for a target color (already in the match space).
 
         If allow_reuse is False, excludes recently used tiles in nearby positions.
         If randomize is True, picks randomly from top N valid candidates to avoid patterns.
         Diversity weight penalizes frequently-used tiles to encourage variety.
+        nearest is this cell's precomputed KD-tree shortlist from tree_shortlists, if any.
         """
-        # Calculate base color distances to all tiles
-        base_distances = [color_distance(target_color, c) for c in self.colors]
-
-        # Apply diversity penalty if enabled
-        if self.diversity_weight > 0:
-            # Calculate usage penalty: tiles used more get higher penalty
-            # Normalize by max possible uses to keep scale reasonable
-            max_usage = max(self.usage_count.values()) if self.usage_count else 1
-            max_usage = max(max_usage, 1)  # Avoid division by zero
-
-            # Penalty scales with diversity_weight and usage count
-            # At diversity_weight=1.0, a tile at max_usage gets ~100 added to its distance
-            adjusted_distances = []
-            for i, base_dist in enumerate(base_distances):
-                usage_penalty = (self.usage_count[i] / max_usage) * self.diversity_weight * 100
-                adjusted_distances.append((i, base_dist + usage_penalty))
-        else:
-            adjusted_distances = [(i, d) for i, d in enumerate(base_distances)]
-
-        # Sort by adjusted distance
-        adjusted_distances.sort(key=lambda x: x[1])
-
         # Find valid tile (respecting reuse rules)
-        # Validate if: no-reuse mode, OR max_reuse limit set, OR min_distance set
-        need_validation = (not self.allow_reuse) or (self.max_reuse > 0) or (self.min_reuse_distance > 0)
+        need_validation = self.has_reuse_rules()
+        shortlist = top_n * 3 if need_validation else 1
+
+        if self.color_tree is not None and self.diversity_weight <= 0:
+            # No usage penalty: ranking is plain nearest-neighbour, so ask the KD-tree
+            candidates = self._tree_candidates(target_color, shortlist, nearest)
+        else:
+            candidates = self._ranked_candidates(self._match_distances(target_color), shortlist)
 
         if not need_validation:
             # Unlimited reuse, just pick the best match
-            tile_idx = adjusted_distances[0][0]
+            tile_idx = next(candidates)
             self._record_usage(tile_idx, position)
             return self.tiles[tile_idx]
 
-        # Collect valid candidates (up to top_n for randomization)
+        # Collect valid candidates (up to top_n for randomization),
+        # validating a shortlist-sized batch of candidates at a time
         valid_candidates = []
-        for tile_idx, dist in adjusted_distances:
-            if self._is_valid_position(tile_idx, position):
-                valid_candidates.append((tile_idx, dist))
-                if len(valid_candidates) >= top_n:
-                    break
+        while len(valid_candidates) < top_n:
+            batch = np.fromiter(islice(candidates, shortlist), dtype=np.intp)
+            if not len(batch):
+                break
+            valid = batch[self._valid_mask(batch, position)]
+            valid_candidates.extend(valid[:top_n - len(valid_candidates)].tolist())
 
         if valid_candidates:
             if randomize and len(valid_candidates) > 1:
                 # Pick randomly from valid candidates, weighted toward better matches
-                # Use exponential weights so best matches are more likely
-                weights = [1.0 / (1 + i * 0.5) for i in range(len(valid_candidates))]
-                total = sum(weights)
-                weights = [w / total for w in weights]
-                chosen_idx = random.choices(range(len(valid_candidates)), weights=weights, k=1)[0]
-                tile_idx = valid_candidates[chosen_idx][0]
+                cum_weights = _candidate_cum_weights(len(valid_candidates))
+                chosen_idx = random.choices(range(len(valid_candidates)), cum_weights=cum_weights, k=1)[0]
+                tile_idx = valid_candidates[chosen_idx]
             else:
-                tile_idx = valid_candidates[0][0]
+                tile_idx = valid_candidates[0]
             self._record_usage(tile_idx, position)
             return self.tiles[tile_idx]
 
         # Fallback: all tiles maxed out or too close - find least-used tile
-        least_used_idx = min(range(len(self.tiles)), key=lambda i: self.usage_count[i])
+        least_used_idx = int(np.argmin(self.usage_count))
         self._record_usage(least_used_idx, position)
         return self.tiles[least_used_idx]
 
-    def _is_valid_position(self, tile_idx: int, position: Tuple[int, int]) -> bool:
-        """Check if tile can be placed at position (respects max_reuse and min_distance)."""
+    def find_best_matches(self, target_colors: np.ndarray, chunk_size: int = 1024) -> np.ndarray:
+        """
+        Best matching tile index for each of many target colors at once.
+
+        Only equivalent to per-cell find_best_match when there are no reuse
+        rules and no diversity penalty, so each cell's pick is independent.
+        """
+        targets = np.asarray(target_colors, dtype=np.float64).reshape(-1, 3)
+
+        # Flat regions and logos repeat the same cell color many times; match
+        # each distinct color once and fan the result back out
+        targets, inverse = np.unique(targets, axis=0, return_inverse=True)
+        best = self._nearest_tiles(targets, chunk_size)[inverse.ravel()]
+
+        np.add.at(self.usage_count, best, 1)
+        return best
+
+    def _nearest_tiles(self, targets: np.ndarray, chunk_size: int) -> np.ndarray:
+        """Nearest tile index for each (float64) target color, without recording usage."""
+        if self.color_tree is not None:
+            # Batched KD-tree query: log-time per cell instead of a scan over every tile
+            _, best = self.color_tree.query(targets)
+            return np.asarray(best, dtype=np.intp)
+
+        colors = self.colors_arr.astype(np.float64)
+
+        # ||a-b||^2 = ||a||^2 + ||b||^2 - 2a.b; ||a||^2 is constant per row so it
+        # doesn't change the argmin. RGB colors are integers, so this is exact in float64.
+        tile_sq = np.einsum('ij,ij->i', colors, colors)
+        best = np.empty(len(targets), dtype=np.intp)
+        for start in range(0, len(targets), chunk_size):
+            distances = targets[start:start + chunk_size] @ colors.T
+            distances *= -2
+            distances += tile_sq
+            best[start:start + chunk_size] = distances.argmin(axis=1)
+        return best
+
+    def to_match_space(self, colors: np.ndarray) -> np.ndarray:
+        """Convert RGB colors (any leading shape) to the float32 space tiles are matched in."""
+        if self.color_space == "lab":
+            return rgb_to_lab(colors)
+        return np.asarray(colors, dtype=np.float32)
+
+    def has_reuse_rules(self) -> bool:
+        """True if placements must be validated: no-reuse mode, OR max_reuse limit set, OR min_distance set."""
+        return (not self.allow_reuse) or (self.max_reuse > 0) or (self.min_reuse_distance > 0)
+
+    def _match_distances(self, target_color: np.ndarray) -> np.ndarray:
+        """Distance from target_color to every tile, including any diversity penalty."""
+        # Squared color distances to all tiles in one pass
+        diff = self.colors_arr - np.asarray(target_color, dtype=np.float32)
+        sq_distances = np.einsum('ij,ij->i', diff, diff)
+
+        if self.diversity_weight <= 0:
+            # Squared distance ranks identically to Euclidean distance
+            return sq_distances
+
+        # Calculate usage penalty: tiles used more get higher penalty
+        # Normalize by max possible uses to keep scale reasonable
+        max_usage = max(int(self.usage_count.max()), 1)  # Avoid division by zero
+
+        # Penalty scales with diversity_weight and usage count
+        # At diversity_weight=1.0, a tile at max_usage gets ~100 added to its distance
+        # (penalty is in distance units, so rank on the true Euclidean distance here)
+        usage_penalty = (self.usage_count / max_usage) * self.diversity_weight * 100
+        return np.sqrt(sq_distances, dtype=np.float64) + usage_penalty
+
+    def tree_shortlists(self, target_colors: np.ndarray, top_n: int = 10) -> Optional[np.ndarray]:
+        """
+        KD-tree shortlists for many target colors in one batched query.
+
+        Returns an array of shape target_colors.shape[:-1] + (k,) to pass to
+        find_best_match as nearest, or None when find_best_match wouldn't
+        consult the tree (no tree, diversity penalty, or no reuse rules).
+        """
+        if self.color_tree is None or self.diversity_weight > 0 or not self.has_reuse_rules():
+            return None
+        targets = np.asarray(target_colors)
+        k = min(top_n * 3, len(self.tiles))
+        _, nearest = self.color_tree.query(targets.reshape(-1, 3), k=k)
+        return np.asarray(nearest, dtype=np.intp).reshape(*targets.shape[:-1], k)
+
+    def _tree_candidates(self, target_color: np.ndarray, k: int, nearest: Optional[np.ndarray] = None):
+        """
+        Yield tile indices nearest-first using the KD-tree.
+
+        The tree answers the k nearest (unless already given as nearest); if
+        validation rejects all of them the remaining tiles are ranked with a full scan.
+        """
+        k = min(k, len(self.tiles))
+        if nearest is None:
+            _, nearest = self.color_tree.query(target_color, k=k)
+        nearest = np.atleast_1d(nearest)
+        yield from nearest.tolist()
+
+        if k < len(self.tiles):
+            distances = self._match_distances(target_color)
+            remaining = np.ones(len(distances), dtype=bool)
+            remaining[nearest] = False
+            rest = np.flatnonzero(remaining)
+            yield from rest[np.argsort(distances[rest], kind="stable")].tolist()
+
+    @staticmethod
+    def _ranked_candidates(distances: np.ndarray, k: int):
+        """
+        Yield tile indices in ascending distance order (ties by index).
+
+        Only the k nearest are partitioned out and sorted up front; the rest
+        are sorted lazily if validation rejects every one of those.
+        """
+        k = min(k, len(distances))
+        kth_distance = np.partition(distances, k - 1)[k - 1]
+
+        nearest = np.flatnonzero(distances <= kth_distance)
+        yield from nearest[np.argsort(distances[nearest], kind="stable")].tolist()
+
+        rest = np.flatnonzero(distances > kth_distance)
+        yield from rest[np.argsort(distances[rest], kind="stable")].tolist()
+
+    def _valid_mask(self, tile_indices: np.ndarray, position: Tuple[int, int]) -> np.ndarray:
+        """Which tiles can be placed at position (respects max_reuse and min_distance)."""
+        valid = np.ones(len(tile_indices), dtype=bool)
+
         # Check max reuse limit
-        if self.max_reuse > 0 and self.usage_count[tile_idx] >= self.max_reuse:
-            return False
+        if self.max_reuse > 0:
+            valid &= self.usage_count[tile_indices] < self.max_reuse
 
-        # Check minimum distance from same tile
-        for prev_pos in self.recent_usage[tile_idx]:
-            dist = abs(position[0] - prev_pos[0]) + abs(position[1] - prev_pos[1])
-            if dist < self.min_reuse_distance:
-                return False
-        return True
+        # Check minimum Manhattan distance from recent uses of the same tile
+        if self.min_reuse_distance > 0:
+            offsets = np.abs(self.recent_positions[tile_indices] - np.asarray(position, dtype=np.int32))
+            valid &= offsets.sum(axis=-1).min(axis=-1) >= self.min_reuse_distance
+        return valid
 
     def _record_usage(self, tile_idx: int, position: Tuple[int, int]):
         """Record that a tile was used at a position."""
-        self.recent_usage[tile_idx].append(position)
+        # Ring buffer keeps only recent history for distance checking
+        head = self.recent_head[tile_idx]
+        self.recent_positions[tile_idx, head] = position
+        self.recent_head[tile_idx] = (head + 1) % RECENT_USAGE_WINDOW
         self.usage_count[tile_idx] += 1
-        # Keep only recent history for distance checking
-        if len(self.recent_usage[tile_idx]) > 100:
-            self.recent_usage[tile_idx] = self.recent_usage[tile_idx][-50:]
+
+
+@lru_cache(maxsize=None)
+def _candidate_cum_weights(n: int) -> Tuple[float, ...]:
+    """
+    Cumulative selection weights for n ranked candidates.
+
+    Weights fall off as 1/(1 + 0.5*rank) so best matches are more likely.
+    Only depends on n (at most top_n), so each distribution is built once.
+    """
+    weights = [1.0 / (1 + i * 0.5) for i in range(n)]
+    total = sum(weights)
+    return tuple(accumulate(w / total for w in weights))
 
 
 # =============================================================================
@@ -569,6 +1005,9 @@ def create_mosaic(
     blend_mode: str = "normal",
     no_color_match: bool = False,
     region_tint: bool = False,
+    use_tile_cache: bool = True,
+    tile_resample: str = "auto",
+    color_space: str = "rgb",
 ) -> str:
     """
     Create a photo mosaic from tile images.
@@ -592,6 +1031,9 @@ def create_mosaic(
         no_color_match: If True, pick tiles randomly instead of by color similarity
         region_tint: If True, apply different tints based on target image color at each cell
                      (pink regions get pink tint, black regions get black tint, etc.)
+        use_tile_cache: If True, reuse prepared tiles cached on disk from a previous run
+        tile_resample: Filter for shrinking tiles: auto (box for small tiles), box, bilinear, lanczos
+        color_space: Space color matching measures distance in: rgb, or lab (perceptual)
 
     Returns:
         Path to the created mosaic
@@ -599,7 +1041,7 @@ def create_mosaic(
     # Load target image
     print(f"\nLoading target image: {target_path}")
     target = Image.open(target_path).convert("RGB")
-    target_array = np.array(target)
+    target_array = np.asarray(target)  # Read-only, which is fine: the target is never modified
 
     target_h, target_w = target_array.shape[:2]
     print(f"Target size: {target_w}x{target_h}")
@@ -645,6 +1087,9 @@ def create_mosaic(
         min_reuse_distance=min_reuse_distance,
         max_reuse=max_reuse,
         diversity_weight=diversity_weight,
+        use_cache=use_tile_cache,
+        resample=tile_resample,
+        color_space=color_space,
     )
 
     if grid_w * grid_h > len(pool.tiles) and not allow_reuse:
@@ -656,10 +1101,11 @@ def create_mosaic(
         pool.allow_reuse = True
         pool.max_reuse = min_reuse_per_tile
 
-    # Create output image
-    output_w = grid_w * tile_size * enlargement
-    output_h = grid_h * tile_size * enlargement
-    output = np.zeros((output_h, output_w, 3), dtype=np.uint8)
+    # Output is stored as one contiguous block per grid cell so each tile
+    # write is a single memcpy; reordered to image layout at the end
+    out_tile_size = tile_size * enlargement
+    output_w = grid_w * out_tile_size
+    output_h = grid_h * out_tile_size
 
     print(f"Output size: {output_w}x{output_h}")
     print("\nGenerating mosaic...")
@@ -668,57 +1114,96 @@ def create_mosaic(
     total_tiles = grid_w * grid_h
     bg_cells_skipped = 0
 
-    with tqdm(total=total_tiles, desc="Building mosaic") as pbar:
-        for gy in range(grid_h):
-            for gx in range(grid_w):
-                # Get region bounds in target image
-                x = gx * tile_size
-                y = gy * tile_size
-
-                # Check if this cell is background
-                if bg_color and is_background_cell(
-                    target_array, x, y, tile_size, tile_size,
-                    bg_color, threshold=bg_threshold
-                ):
-                    # Fill with background color instead of tile
-                    out_x = gx * tile_size * enlargement
-                    out_y = gy * tile_size * enlargement
-                    out_tile_size = tile_size * enlargement
-                    output[out_y:out_y+out_tile_size, out_x:out_x+out_tile_size] = bg_color
-                    bg_cells_skipped += 1
+    # Classify all background cells up front
+    bg_mask = None
+    if bg_color:
+        bg_mask = compute_background_mask(
+            target_array, grid_w, grid_h, tile_size,
+            bg_color, threshold=bg_threshold
+        )
+
+    # Average color of every cell (used for matching and/or region detection),
+    # plus the same colors in the matching color space, converted once
+    cell_averages = compute_cell_averages(target_array, grid_w, grid_h, tile_size)
+    cell_match_colors = pool.to_match_space(cell_averages)
+
+    # Without reuse rules or a diversity penalty every cell's best match is
+    # independent of the others, so solve them all in one pass
+    best_tiles = None
+    if not no_color_match and not pool.has_reuse_rules() and pool.diversity_weight <= 0:
+        tile_cells = ~bg_mask if bg_mask is not None else np.ones((grid_h, grid_w), dtype=bool)
+        best_tiles = np.zeros((grid_h, grid_w), dtype=np.intp)
+        best_tiles[tile_cells] = pool.find_best_matches(cell_match_colors[tile_cells])
+
+    # With reuse rules the cells must be placed one at a time, but their KD-tree
+    # shortlists don't depend on earlier placements: query them all up front
+    shortlists = None
+    if best_tiles is None and not no_color_match:
+        shortlists = pool.tree_shortlists(cell_match_colors)
+
+    # Region of every cell, plus one specialized tint function per region
+    cell_regions = None
+    region_tint_fns = {}
+    if region_tints:
+        cell_regions = classify_regions(cell_averages)
+        for region in REGION_COLORS:
+            region_tint_color = get_region_tint(region, region_tints)
+            if region_tint_color:
+                region_tint_fns[region] = make_tint_fn(region_tint_color, tint_alpha, blend_mode)
+
+    if best_tiles is not None:
+        # Every cell's tile is already known: place them all with one gather
+        # (background cells are overwritten with the background color below)
+        output_cells = np.asarray(pool.tiles[best_tiles])
+        if bg_mask is not None:
+            bg_cells_skipped = int(np.count_nonzero(bg_mask))
+    else:
+        # Left uninitialized: every cell gets a tile or the background color
+        output_cells = np.empty((grid_h, grid_w, out_tile_size, out_tile_size, 3), dtype=np.uint8)
+        with tqdm(total=total_tiles, desc="Building mosaic") as pbar:
+            for gy in range(grid_h):
+                for gx in range(grid_w):
+                    # Check if this cell is background
+                    if bg_mask is not None and bg_mask[gy, gx]:
+                        # Filled with background color after the loop
+                        bg_cells_skipped += 1
+                        pbar.update(1)
+                        continue
+
+                    # Find tile - either by color matching or randomly
+                    if no_color_match:
+                        tile = pool.find_random_tile((gx, gy))
+                    else:
+                        nearest = shortlists[gy, gx] if shortlists is not None else None
+                        tile = pool.find_best_match(cell_match_colors[gy, gx], (gx, gy), nearest=nearest)
+
+                    # Place tile in output
+                    output_cells[gy, gx] = tile
+
                     pbar.update(1)
-                    continue
-
-                # Get target color for this cell (used for matching and/or region detection)
-                target_color = get_region_average(target_array, x, y, tile_size, tile_size)
-
-                # Find tile - either by color matching or randomly
-                if no_color_match:
-                    tile = pool.find_random_tile((gx, gy))
-                else:
-                    tile = pool.find_best_match(target_color, (gx, gy))
-
-                # Apply tint - either region-based or global
-                if region_tints:
-                    # Classify this cell's region and apply appropriate tint
-                    region = classify_region(target_color)
-                    region_tint_color = get_region_tint(region, region_tints) if region else None
-                    if region_tint_color:
-                        tile = apply_tint(tile, region_tint_color, tint_alpha, blend_mode)
-                elif tint_color:
-                    tile = apply_tint(tile, tint_color, tint_alpha, blend_mode)
-
-                # Place tile in output
-                out_x = gx * tile_size * enlargement
-                out_y = gy * tile_size * enlargement
-                tile_h, tile_w = tile.shape[:2]
-                output[out_y:out_y+tile_h, out_x:out_x+tile_w] = tile
-
-                pbar.update(1)
+
+    # Apply region-based tints, one masked pass per region (global tint is below)
+    for region, tint_fn in region_tint_fns.items():
+        cells = cell_regions == region
+        if bg_mask is not None:
+            cells &= ~bg_mask
+        if cells.any():
+            output_cells[cells] = tint_fn(output_cells[cells])
 
     if bg_cells_skipped > 0:
         print(f"Skipped {bg_cells_skipped} background cells ({bg_cells_skipped / total_tiles:.1%} of grid)")
 
+    # Apply global tint to every placed tile in one pass
+    if tint_color and not region_tints:
+        output_cells = apply_tint(output_cells, tint_color, tint_alpha, blend_mode)
+
+    # Fill background cells with the background color (untinted)
+    if bg_mask is not None:
+        output_cells[bg_mask] = bg_color
+
+    # Reorder cell blocks into image layout
+    output = output_cells.transpose(0, 2, 1, 3, 4).reshape(output_h, output_w, 3)
+
     # Convert to PIL Image
     output_img = Image.fromarray(output)
 
@@ -729,40 +1214,7 @@ def create_mosaic(
         target_resized = target.resize((output_w, output_h), Image.Resampling.LANCZOS)
 
         # Apply blend mode between mosaic (base) and target (overlay)
-        mosaic_arr = np.array(output_img)
-        target_arr = np.array(target_resized)
-
-        # Use apply_tint logic but with full image overlay instead of solid color
-        base = mosaic_arr.astype(np.float32) / 255.0
-        overlay = target_arr.astype(np.float32) / 255.0
-
-        if blend_mode == "normal":
-            blended = (1 - cheat_alpha) * base + cheat_alpha * overlay
-        elif blend_mode == "multiply":
-            multiplied = base * overlay
-            blended = (1 - cheat_alpha) * base + cheat_alpha * multiplied
-        elif blend_mode == "screen":
-            screened = 1 - (1 - base) * (1 - overlay)
-            blended = (1 - cheat_alpha) * base + cheat_alpha * screened
-        elif blend_mode == "overlay":
-            dark_mask = base < 0.5
-            overlayed = np.where(dark_mask, 2 * base * overlay, 1 - 2 * (1 - base) * (1 - overlay))
-            blended = (1 - cheat_alpha) * base + cheat_alpha * overlayed
-        elif blend_mode == "soft_light":
-            soft = (1 - 2 * overlay) * (base ** 2) + 2 * overlay * base
-            blended = (1 - cheat_alpha) * base + cheat_alpha * soft
-        elif blend_mode == "color":
-            # Apply overlay hue/saturation, keep base luminosity
-            base_lum = 0.299 * base[:,:,0] + 0.587 * base[:,:,1] + 0.114 * base[:,:,2]
-            overlay_lum = 0.299 * overlay[:,:,0] + 0.587 * overlay[:,:,1] + 0.114 * overlay[:,:,2]
-            overlay_lum = np.maximum(overlay_lum, 0.001)
-            scale = base_lum[:,:,np.newaxis] / overlay_lum[:,:,np.newaxis]
-            colored = np.clip(overlay * scale, 0, 1)
-            blended = (1 - cheat_alpha) * base + cheat_alpha * colored
-        else:
-            blended = (1 - cheat_alpha) * base + cheat_alpha * overlay
-
-        blended = np.clip(blended * 255, 0, 255).astype(np.uint8)
+        blended = apply_cheat_blend(output, np.asarray(target_resized), cheat_alpha, blend_mode)
         output_img = Image.fromarray(blended)
 
     # Save output
@@ -788,6 +1240,15 @@ def load_config(config_path: str) -> dict:
         print(f"Error: Config file not found: {config_path}", file=sys.stderr)
         sys.exit(1)
 
+    # Callers merge CLI values into the result, so hand out a copy of the cached dict
+    mtime = config_file.stat().st_mtime_ns
+    return copy.deepcopy(_load_config_cached(str(config_file), mtime))
+
+
+@lru_cache(maxsize=32)
+def _load_config_cached(config_path: str, mtime: int) -> dict:
+    """Parse a config file; cached per (path, mtime) so edits are picked up."""
+    config_file = Path(config_path)
     with open(config_file) as f:
         config = json.load(f)
 
@@ -812,8 +1273,35 @@ def generate_output_filename(config: dict, output_dir: str) -> str:
 # Main
 # =============================================================================
 
+class _ArgumentParser(argparse.ArgumentParser):
+    """
+    ArgumentParser that reuses one formatter for add_argument's metavar check.
+
+    add_argument builds a throwaway help formatter per call just to validate
+    the metavar (on 3.14+ that also re-reads the color env vars). With ~30
+    flags that shows up in startup time, so keep one around for the check.
+    Help/usage output still gets a fresh formatter each time.
+    """
+    _adding_argument = False
+    _check_formatter = None
+
+    def add_argument(self, *args, **kwargs):
+        self._adding_argument = True
+        try:
+            return super().add_argument(*args, **kwargs)
+        finally:
+            self._adding_argument = False
+
+    def _get_formatter(self):
+        if not self._adding_argument:
+            return super()._get_formatter()
+        if self._check_formatter is None:
+            self._check_formatter = super()._get_formatter()
+        return self._check_formatter
+
+
 def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
+    parser = _ArgumentParser(
         description="Create a photo mosaic from tile images. Use --config for show-specific presets."
     )
 
@@ -907,6 +1395,27 @@ def parse_args() -> argparse.Namespace:
         help="Apply different tints based on target image color at each cell "
              "(pink regions get pink tint, black get black tint, yellow get yellow tint)"
     )
+    parser.add_argument(
+        "--tile-resample",
+        type=str,
+        default=None,
+        choices=["auto", *RESAMPLE_FILTERS],
+        help=f"Filter used to shrink tiles: auto (box up to {SMALL_TILE_MAX}px, lanczos above), "
+             "box (fastest), bilinear, lanczos (highest quality). Default: auto"
+    )
+    parser.add_argument(
+        "--color-space",
+        type=str,
+        default=None,
+        choices=COLOR_SPACES,
+        help="Color space for matching tiles to cells: rgb, or lab (distance tracks "
+             "perceived color difference). Default: rgb"
+    )
+    parser.add_argument(
+        "--no-tile-cache",
+        action="store_true",
+        help=f"Re-decode all tiles instead of reusing prepared tiles cached in {TILE_CACHE_DIR}"
+    )
 
     return parser.parse_args()
 
@@ -958,6 +1467,8 @@ def main():
     tint = get_val('tint', 'tint', None)
     tint_alpha = get_val('tint_alpha', 'tint_alpha', 0.25)
     blend_mode = get_val('blend_mode', 'blend_mode', 'normal')
+    tile_resample = get_val('tile_resample', 'tile_resample', 'auto')
+    color_space = get_val('color_space', 'color_space', 'rgb')
 
     # Handle output path
     output_path = args.output
@@ -1004,6 +1515,9 @@ def main():
         blend_mode=blend_mode,
         no_color_match=args.no_color_match,
         region_tint=args.region_tint,
+        use_tile_cache=not args.no_tile_cache,
+        tile_resample=tile_resample,
+        color_space=color_space,
     )
 
     print("\n" + "=" * 60)
@@ -13,15 +13,19 @@ Usage:
 
 import argparse
 import hashlib
+import json
 import os
 import sys
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Set, List, Dict, Optional
-from urllib.request import urlretrieve
-from urllib.error import URLError
+from typing import Set, List, Dict, Optional, Tuple
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from spotipy.exceptions import SpotifyException
@@ -43,7 +47,24 @@ except ImportError:
 DEFAULT_OUTPUT_DIR = "./album_covers"
 IMAGE_SIZE = 640  # Spotify provides 640x640, 300x300, 64x64
 API_DELAY = 0.1   # Be nice to Spotify
-DOWNLOAD_DELAY = 0.05  # Be nice when downloading images
+TRACK_WORKERS = 4  # Concurrent track-metadata batches (spotipy retries 429s)
+DOWNLOAD_WORKERS = 16  # Parallel image downloads (bounds load on the CDN)
+DOWNLOAD_TIMEOUT = 30  # Seconds per image request
+CHUNK_SIZE = 64 * 1024  # Bytes per read/write when streaming images to disk
+ALBUM_ART_CACHE = ".album_art.json"  # Playlist album list, kept in the output dir
+PLAYLIST_ID_RES = [
+    re.compile(r'spotify\.com/playlist/([a-zA-Z0-9]+)'),
+    re.compile(r'spotify:playlist:([a-zA-Z0-9]+)'),
+]
+
+
+@dataclass(slots=True)
+class AlbumArt:
+    """One unique album cover to download."""
+    album_id: str
+    album_name: str
+    artist: str
+    image_url: str
 
 
 # =============================================================================
@@ -70,13 +91,8 @@ def get_spotify_client() -> spotipy.Spotify:
 def extract_playlist_id(playlist_input: str) -> str:
     """Extract playlist ID from URL or return as-is if already an ID."""
     # Handle Spotify URLs
-    patterns = [
-        r'spotify\.com/playlist/([a-zA-Z0-9]+)',
-        r'spotify:playlist:([a-zA-Z0-9]+)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, playlist_input)
+    for pattern in PLAYLIST_ID_RES:
+        match = pattern.search(playlist_input)
         if match:
             return match.group(1)
 
@@ -88,22 +104,49 @@ def extract_playlist_id(playlist_input: str) -> str:
 # Album Art Collection
 # =============================================================================
 
+def album_art_for_track(track: Optional[Dict], albums_seen: Set[str]) -> Optional[AlbumArt]:
+    """
+    AlbumArt for a track's album the first time that album is seen, else None.
+
+    Duplicate albums are rejected by ID before any other field is read.
+    """
+    if not track:
+        return None
+
+    album = track.get("album") or {}
+    album_id = album.get("id")
+    if not album_id or album_id in albums_seen:
+        return None
+    albums_seen.add(album_id)
+
+    # Get the largest image (first in the list)
+    images = album.get("images")
+    image_url = images[0].get("url") if images else None  # 640x640
+    if not image_url:
+        return None
+
+    artists = track.get("artists")
+    artist_name = artists[0]["name"] if artists else "Unknown"
+    return AlbumArt(album_id, album.get("name", "Unknown"), artist_name, image_url)
+
+
 def get_album_art_from_playlist(
     sp: spotipy.Spotify,
     playlist_id: str,
     progress_callback=None
-) -> List[Dict]:
+) -> Tuple[List[AlbumArt], bool]:
     """
     Fetch all unique album art URLs from a playlist.
 
-    Returns list of dicts: {album_id, album_name, artist, image_url}
+    Returns (album_art, complete); complete is False if a page failed to load.
     """
     albums_seen: Set[str] = set()
-    album_art: List[Dict] = []
+    album_art: List[AlbumArt] = []
 
     offset = 0
     limit = 100
     total = None
+    complete = False
 
     while True:
         try:
@@ -111,7 +154,8 @@ def get_album_art_from_playlist(
                 playlist_id,
                 offset=offset,
                 limit=limit,
-                fields="items(track(album(id,name,images),artists(name))),total"
+                # Only the fields used; images(url) drops each image's width/height
+                fields="items(track(album(id,name,images(url)),artists(name))),total"
             )
         except SpotifyException as e:
             print(f"Error fetching playlist tracks: {e}", file=sys.stderr)
@@ -123,35 +167,13 @@ def get_album_art_from_playlist(
 
         items = results.get("items", [])
         if not items:
+            complete = True
             break
 
         for item in items:
-            track = item.get("track")
-            if not track:
-                continue
-
-            album = track.get("album", {})
-            album_id = album.get("id")
-
-            if not album_id or album_id in albums_seen:
-                continue
-
-            albums_seen.add(album_id)
-
-            # Get the largest image (first in the list)
-            images = album.get("images", [])
-            if images:
-                image_url = images[0].get("url")  # 640x640
-                if image_url:
-                    artists = track.get("artists", [])
-                    artist_name = artists[0]["name"] if artists else "Unknown"
-
-                    album_art.append({
-                        "album_id": album_id,
-                        "album_name": album.get("name", "Unknown"),
-                        "artist": artist_name,
-                        "image_url": image_url,
-                    })
+            art = album_art_for_track(item.get("track"), albums_seen)
+            if art:
+                album_art.append(art)
 
         offset += limit
 
@@ -159,14 +181,58 @@ def get_album_art_from_playlist(
             progress_callback(offset, total)
 
         if offset >= total:
+            complete = True
             break
 
         time.sleep(API_DELAY)
 
+    return album_art, complete
+
+
+def get_playlist_album_art_cached(
+    sp: spotipy.Spotify,
+    playlist_id: str,
+    cache_path: Path,
+    progress_callback=None,
+) -> List[AlbumArt]:
+    """
+    Album art for a playlist, reusing the last run's list if the playlist is unchanged.
+
+    The cache is keyed on the playlist's snapshot_id, which Spotify changes on
+    every edit, so an unchanged playlist costs one API call instead of a full scan.
+    """
+    try:
+        snapshot_id = sp.playlist(playlist_id, fields="snapshot_id")["snapshot_id"]
+    except SpotifyException as e:
+        print(f"Could not read playlist snapshot, skipping cache: {e}", file=sys.stderr)
+        snapshot_id = None
+
+    if snapshot_id:
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached.get("playlist_id") == playlist_id and cached.get("snapshot_id") == snapshot_id:
+                print("Playlist unchanged since last run, using cached album list")
+                return [AlbumArt(**album) for album in cached["albums"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # No usable cache: fetch below
+
+    album_art, complete = get_album_art_from_playlist(sp, playlist_id, progress_callback)
+
+    # Only a full scan is safe to reuse until the playlist next changes
+    if snapshot_id and complete:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump({
+                "playlist_id": playlist_id,
+                "snapshot_id": snapshot_id,
+                "albums": [asdict(album) for album in album_art],
+            }, f)
+
     return album_art
 
 
-def get_album_art_from_database(show_id: int) -> List[Dict]:
+def get_album_art_from_database(show_id: int) -> List[AlbumArt]:
     """
     Fetch album art URLs from Neon database.
     Uses spotify_track_id to reconstruct album info.
@@ -206,49 +272,31 @@ def get_album_art_from_database(show_id: int) -> List[Dict]:
     sp = get_spotify_client()
 
     albums_seen: Set[str] = set()
-    album_art: List[Dict] = []
+    album_art: List[AlbumArt] = []
 
     track_ids = [row["spotify_track_id"] for row in rows]
 
-    # Spotify allows up to 50 tracks per request
-    batch_size = 50
-    for i in range(0, len(track_ids), batch_size):
-        batch = track_ids[i:i+batch_size]
-
+    def fetch_batch(batch: List[str]) -> List[Dict]:
         try:
-            tracks = sp.tracks(batch)
+            return sp.tracks(batch).get("tracks", [])
         except SpotifyException as e:
             print(f"Error fetching tracks: {e}", file=sys.stderr)
-            continue
-
-        for track in tracks.get("tracks", []):
-            if not track:
-                continue
-
-            album = track.get("album", {})
-            album_id = album.get("id")
+            return []
 
-            if not album_id or album_id in albums_seen:
-                continue
-
-            albums_seen.add(album_id)
-
-            images = album.get("images", [])
-            if images:
-                image_url = images[0].get("url")
-                if image_url:
-                    artists = track.get("artists", [])
-                    artist_name = artists[0]["name"] if artists else "Unknown"
+    # Spotify allows up to 50 tracks per request
+    batch_size = 50
+    batches = [track_ids[i:i+batch_size] for i in range(0, len(track_ids), batch_size)]
 
-                    album_art.append({
-                        "album_id": album_id,
-                        "album_name": album.get("name", "Unknown"),
-                        "artist": artist_name,
-                        "image_url": image_url,
-                    })
+    # Batches are independent, so fetch a few at once; map keeps them in order,
+    # so the first track seen for each album is the same as a serial run
+    with ThreadPoolExecutor(max_workers=TRACK_WORKERS) as executor:
+        for done, tracks in enumerate(executor.map(fetch_batch, batches), 1):
+            for track in tracks:
+                art = album_art_for_track(track, albums_seen)
+                if art:
+                    album_art.append(art)
 
-        print(f"  Fetched {min(i+batch_size, len(track_ids))}/{len(track_ids)} tracks...")
-        time.sleep(API_DELAY)
+            print(f"  Fetched {min(done * batch_size, len(track_ids))}/{len(track_ids)} tracks...")
 
     return album_art
 
@@ -257,8 +305,41 @@ def get_album_art_from_database(show_id: int) -> List[Dict]:
 # Image Download
 # =============================================================================
 
+def make_session() -> requests.Session:
+    """Shared session: keep-alive connections to the image CDN, retries on transient errors."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    # One pooled connection per download worker so threads never wait on the pool
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_WORKERS, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download_file(session: requests.Session, url: str, filepath: Path):
+    """
+    Stream url to filepath; raises on failure without leaving a partial file.
+
+    Writes to a .part file and renames it into place, so an interrupted run
+    never leaves a truncated image that the next run would skip as existing.
+    """
+    part_path = filepath.with_name(filepath.name + ".part")
+    try:
+        with session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            # iter_content undoes transfer compression and turns truncated or
+            # timed-out bodies into requests exceptions (raw urllib3 reads don't)
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(part_path, filepath)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
 def download_images(
-    album_art: List[Dict],
+    album_art: List[AlbumArt],
     output_dir: str,
     skip_existing: bool = True,
 ) -> Dict[str, int]:
@@ -275,28 +356,45 @@ def download_images(
 
     print(f"\nDownloading {total} album covers to {output_dir}/")
 
-    for i, album in enumerate(album_art):
+    # One directory listing instead of a stat() per album
+    existing = {entry.name for entry in os.scandir(output_path)} if skip_existing else set()
+
+    pending = []  # (album, filepath) still to download
+    for album in album_art:
         # Create filename from album_id (guaranteed unique)
-        filename = f"{album['album_id']}.jpg"
+        filename = f"{album.album_id}.jpg"
         filepath = output_path / filename
 
-        if skip_existing and filepath.exists():
+        if filename in existing:
             stats["skipped"] += 1
             continue
 
-        try:
-            urlretrieve(album["image_url"], filepath)
-            stats["downloaded"] += 1
-
-            if (i + 1) % 50 == 0 or i == total - 1:
-                print(f"  Progress: {i+1}/{total} "
-                      f"(downloaded: {stats['downloaded']}, skipped: {stats['skipped']})")
+        pending.append((album, filepath))
 
-            time.sleep(DOWNLOAD_DELAY)
+    session = make_session()
 
-        except (URLError, OSError) as e:
-            stats["failed"] += 1
-            print(f"  Failed to download {album['album_name']}: {e}", file=sys.stderr)
+    def download_one(job) -> Optional[Exception]:
+        album, filepath = job
+        try:
+            download_file(session, album.image_url, filepath)
+            return None
+        except (requests.RequestException, OSError) as e:
+            return e
+
+    # Downloads are I/O-bound, so threads overlap connection setup and transfer
+    with session, ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        for done, ((album, _), error) in enumerate(
+            zip(pending, executor.map(download_one, pending)), 1
+        ):
+            if error is None:
+                stats["downloaded"] += 1
+            else:
+                stats["failed"] += 1
+                print(f"  Failed to download {album.album_name}: {error}", file=sys.stderr)
+
+            if done % 50 == 0 or done == len(pending):
+                print(f"  Progress: {stats['skipped'] + done}/{total} "
+                      f"(downloaded: {stats['downloaded']}, skipped: {stats['skipped']})")
 
     return stats
 
@@ -365,7 +463,9 @@ def main():
         def progress(offset, total):
             print(f"  Scanned {offset}/{total} tracks...")
 
-        album_art = get_album_art_from_playlist(sp, playlist_id, progress)
+        album_art = get_playlist_album_art_cached(
+            sp, playlist_id, Path(args.output) / ALBUM_ART_CACHE, progress
+        )
 
     print(f"\nFound {len(album_art)} unique albums")
 
@@ -0,0 +1,77 @@
+"""
+Tests for download_album_art's image downloads.
+
+Run from marketing/:
+    python -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import download_album_art
+from download_album_art import AlbumArt, download_images
+
+DECLARED_LENGTH = 100_000
+SENT_LENGTH = 1_000
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """/full returns a complete image body; /truncated closes after part of it."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(DECLARED_LENGTH))
+        self.end_headers()
+        sent = DECLARED_LENGTH if self.path == "/full" else SENT_LENGTH
+        self.wfile.write(b"x" * sent)
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadImagesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), ImageHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = Path(tmp.name)
+        # No retries, so the truncated response fails once instead of being refetched
+        self._make_session = download_album_art.make_session
+        download_album_art.make_session = lambda: download_album_art.requests.Session()
+
+    def tearDown(self):
+        download_album_art.make_session = self._make_session
+        self.server.shutdown()
+        self.server.server_close()
+
+    def album(self, album_id: str, path: str) -> AlbumArt:
+        return AlbumArt(
+            album_id=album_id,
+            album_name=album_id,
+            artist="Artist",
+            image_url=self.base_url + path,
+        )
+
+    def test_truncated_response_counts_as_failed(self):
+        stats = download_images(
+            [self.album("short", "/truncated"), self.album("whole", "/full")],
+            str(self.output_dir),
+        )
+
+        self.assertEqual(stats, {"downloaded": 1, "skipped": 0, "failed": 1})
+        self.assertEqual((self.output_dir / "whole.jpg").stat().st_size, DECLARED_LENGTH)
+        # Neither the image nor its .part file is left behind for the next run to skip
+        self.assertEqual(sorted(p.name for p in self.output_dir.iterdir()), ["whole.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+-- One-time migration: unique (episode_id, title, artist) index on songs.
+--
+-- tal/fill_songs.py --execute inserts with ON CONFLICT against this index and
+-- refuses to run until it exists. Exact duplicates are removed first (keeping
+-- the lowest id) so the index can be built.
+--
+-- Run once:  psql "$DATABASE_URL" -f pipeline/migrations/001_songs_unique_index.sql
+
+BEGIN;
+
+DELETE FROM songs a
+USING songs b
+WHERE a.id > b.id
+AND a.episode_id = b.episode_id
+AND a.title = b.title
+AND a.artist = b.artist;
+
+CREATE UNIQUE INDEX IF NOT EXISTS songs_ep_title_artist_uniq
+ON songs (episode_id, title, artist);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- One-time migration: Spotify playlist membership mirrored in Neon.
+--
+-- tal/scoring_match.py --sync --execute dedupes playlist additions against
+-- playlist_tracks, which is valid as of the snapshot_id recorded in
+-- playlist_snapshots; it refuses to sync until these tables exist.
+--
+-- Run once:  psql "$DATABASE_URL" -f pipeline/migrations/002_playlist_membership.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id TEXT NOT NULL,
+    spotify_track_id TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, spotify_track_id)
+);
+
+CREATE TABLE IF NOT EXISTS playlist_snapshots (
+    playlist_id TEXT PRIMARY KEY,
+    snapshot_id TEXT NOT NULL
+);
+
+COMMIT;
@@ -13,12 +13,14 @@ Usage:
 import argparse
 import os
 import re
-import time
 import requests
 import psycopg2
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional, Set, Dict
+from typing import List, Optional, Set, Dict, Tuple
 from urllib.parse import unquote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from firecrawl import FirecrawlApp
 from tqdm import tqdm
@@ -35,11 +37,48 @@ FIRECRAWL_API_KEY = os.environ.get("FIRECRAWL_API_KEY")
 NEON_DATABASE_URL = os.environ.get("DATABASE_URL") or os.environ.get("NEON_DATABASE_URL")
 BASE_URL = "https://switchedonpop.com"
 DEFAULT_OUTPUT_DIR = "./episode-art"
-DOWNLOAD_DELAY = 0.05  # seconds between requests
+PAGE_WORKERS = 8  # episode pages fetched in parallel (keeps load on the site polite)
+DOWNLOAD_WORKERS = 16  # parallel image downloads
+PROGRESS_INTERVAL = 0.5  # minimum seconds between progress bar redraws
+CHUNK_SIZE = 64 * 1024  # bytes per write when streaming images to disk
+MAX_IMAGE_BYTES = 5_000_000  # refuse anything bigger: not episode artwork
 REQUEST_TIMEOUT = 15
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
 SOP_SHOW_ID = 1  # SOP show ID in our database
 
+# Compiled once: these run for every episode page
+EPISODE_URL_RE = re.compile(r'/episodes/(\d{1,3})-')  # /episodes/XXX-title
+OG_IMAGE_RES = [
+    re.compile(r'<meta\s+property="og:image"\s+content="([^"]+)"', re.IGNORECASE),
+    re.compile(r'<meta\s+content="([^"]+)"\s+property="og:image"', re.IGNORECASE),
+]
+FILENAME_NUMBER_RE = re.compile(r'^(\d+)[+_\s]')   # "453+Cher.jpg"
+PATH_NUMBER_RE = re.compile(r'/(\d{1,3})[+_\s]')   # ".../318+daft+punk..."
+CONTENT_NUMBER_RES = [
+    re.compile(r'\*\*EPISODE\s+(\d+)\*\*', re.IGNORECASE),  # **EPISODE 435**
+    re.compile(r'EPISODE\s+(\d+)', re.IGNORECASE),  # EPISODE 435
+    re.compile(r'>EPISODE\s+(\d+)<', re.IGNORECASE),  # HTML tags
+]
+
+
+# =============================================================================
+# HTTP Session
+# =============================================================================
+
+def make_session() -> requests.Session:
+    """Shared session: keep-alive connections to each host, retries on transient errors."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    # One pooled connection per download worker so threads never wait on the pool
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_WORKERS, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+SESSION = make_session()
+
 
 # =============================================================================
 # Database Functions
@@ -70,7 +109,7 @@ def load_url_to_episode_map() -> Dict[str, int]:
 
         for (url,) in rows:
             # Extract episode number from URL pattern: /episodes/XXX-title
-            match = re.search(r'/episodes/(\d{1,3})-', url)
+            match = EPISODE_URL_RE.search(url)
             if match:
                 ep_num = int(match.group(1))
                 # Normalize URL for matching (lowercase, no trailing slash)
@@ -116,14 +155,8 @@ def get_episode_urls() -> List[str]:
 
 def extract_og_image(html: str) -> Optional[str]:
     """Extract og:image URL from HTML content."""
-    # Pattern for og:image meta tag
-    patterns = [
-        r'<meta\s+property="og:image"\s+content="([^"]+)"',
-        r'<meta\s+content="([^"]+)"\s+property="og:image"',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, html, re.IGNORECASE)
+    for pattern in OG_IMAGE_RES:
+        match = pattern.search(html)
         if match:
             url = match.group(1)
             # Filter out Substack embed images
@@ -146,12 +179,12 @@ def parse_episode_number_from_filename(url: str) -> Optional[int]:
     filename = unquote(filename)  # Decode URL encoding
 
     # Try to extract leading number
-    match = re.match(r'^(\d+)[+_\s]', filename)
+    match = FILENAME_NUMBER_RE.match(filename)
     if match:
         return int(match.group(1))
 
     # Also try pattern like "318+daft+punk" in the middle of path
-    match = re.search(r'/(\d{1,3})[+_\s]', url)
+    match = PATH_NUMBER_RE.search(url)
     if match:
         num = int(match.group(1))
         if 1 <= num <= 500:  # Reasonable episode number range
@@ -168,15 +201,8 @@ def parse_episode_number_from_content(html: str) -> Optional[int]:
         '**EPISODE 123**'
         'Episode 42'
     """
-    # Pattern for "EPISODE XXX" in content (case insensitive)
-    patterns = [
-        r'\*\*EPISODE\s+(\d+)\*\*',  # **EPISODE 435**
-        r'EPISODE\s+(\d+)',  # EPISODE 435
-        r'>EPISODE\s+(\d+)<',  # HTML tags
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, html, re.IGNORECASE)
+    for pattern in CONTENT_NUMBER_RES:
+        match = pattern.search(html)
         if match:
             num = int(match.group(1))
             if 1 <= num <= 500:  # Reasonable episode number range
@@ -185,37 +211,98 @@ def parse_episode_number_from_content(html: str) -> Optional[int]:
     return None
 
 
-def fetch_page_html(url: str, full_page: bool = False) -> Optional[str]:
-    """Fetch HTML content from a page.
+class EpisodePage:
+    """A streamed episode page, downloaded only as far as it is read.
 
-    Args:
-        url: The URL to fetch
-        full_page: If True, fetch up to 150KB (for episode number in body).
-                   If False, fetch up to 50KB (just head/meta tags).
+    head() reads up to 50KB, stopping at </head> (enough for meta tags).
+    full() keeps reading the same response up to 150KB (for the episode
+    number in the body), so the fallback never downloads the page twice.
+    Both return None if the page can't be fetched.
     """
-    try:
-        max_size = 150000 if full_page else 50000
-        response = requests.get(
-            url,
-            timeout=REQUEST_TIMEOUT,
-            headers={"User-Agent": USER_AGENT},
-            stream=True
-        )
-        response.raise_for_status()
-
-        # Read content up to max_size
-        content = b""
-        for chunk in response.iter_content(chunk_size=8192):
-            content += chunk
-            if len(content) > max_size:
-                break
-            # Early exit if we only need head
-            if not full_page and b"</head>" in content:
-                break
-
-        return content.decode("utf-8", errors="ignore")
-    except Exception as e:
-        return None
+
+    def __init__(self, url: str):
+        self.url = url
+        self.response = None
+        self._chunks = None
+        self.content = bytearray()  # Grows in place as chunks arrive
+
+    def head(self) -> Optional[str]:
+        return self._read(50000, until=b"</head>")
+
+    def full(self) -> Optional[str]:
+        return self._read(150000)
+
+    def _read(self, max_size: int, until: Optional[bytes] = None) -> Optional[str]:
+        try:
+            if self.response is None:
+                self.response = SESSION.get(self.url, timeout=REQUEST_TIMEOUT, stream=True)
+                self.response.raise_for_status()
+                self._chunks = self.response.iter_content(chunk_size=8192)
+
+            # Extend what's been read so far up to max_size (or the until marker),
+            # searching only the newly read bytes for the marker
+            searched = 0
+            while len(self.content) <= max_size:
+                if until and self.content.find(until, searched) != -1:
+                    break
+                if until:
+                    searched = max(0, len(self.content) - len(until) + 1)
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self.content += chunk
+
+            return self.content.decode("utf-8", errors="ignore")
+        except Exception as e:
+            return None
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def resolve_episode_art(url: str, url_map: Dict[str, int]) -> Tuple[str, Optional[str], Optional[int]]:
+    """Find the artwork and episode number for one episode page.
+
+    Returns (source, image_url, episode_number), where source says how the
+    number was found ("filename", "content" or "db"), or why it wasn't:
+    "no_number", "no_image", or "no_page" if the page couldn't be fetched.
+    """
+    with EpisodePage(url) as page:
+        # First pass: get head section for og:image
+        html = page.head()
+        if not html:
+            return "no_page", None, None
+
+        img_url = extract_og_image(html)
+        if not img_url:
+            return "no_image", None, None
+
+        # Try to get episode number from image filename first
+        ep_num = parse_episode_number_from_filename(img_url)
+        if ep_num is not None:
+            return "filename", img_url, ep_num
+
+        # Fallback 1: read more of the body and look for "EPISODE XXX"
+        full_html = page.full()
+        if full_html:
+            ep_num = parse_episode_number_from_content(full_html)
+            if ep_num is not None:
+                return "content", img_url, ep_num
+
+    # Fallback 2: look up episode number from database URL
+    ep_num = get_episode_from_db_url(url, url_map)
+    if ep_num is not None:
+        return "db", img_url, ep_num
+
+    # Still no number found
+    return "no_number", img_url, None
 
 
 # =============================================================================
@@ -223,20 +310,24 @@ def fetch_page_html(url: str, full_page: bool = False) -> Optional[str]:
 # =============================================================================
 
 def download_image(url: str, output_path: Path) -> bool:
-    """Download an image from URL to local path."""
+    """Stream an image from URL to local path (via a .part file, renamed when complete)."""
+    part_path = output_path.with_name(output_path.name + ".part")
     try:
-        response = requests.get(
-            url,
-            timeout=30,
-            headers={"User-Agent": USER_AGENT}
-        )
-        response.raise_for_status()
-
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-
+        with SESSION.get(url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+
+            written = 0
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > MAX_IMAGE_BYTES:
+                        raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+                    f.write(chunk)
+
+        os.replace(part_path, output_path)
         return True
     except Exception as e:
+        part_path.unlink(missing_ok=True)
         return False
 
 
@@ -276,46 +367,29 @@ def download_episode_art(output_dir: Path):
     from_content = 0
     from_db = 0
 
-    for url in tqdm(episode_urls, desc="Fetching metadata"):
-        # First pass: get head section for og:image
-        html = fetch_page_html(url, full_page=False)
-        if not html:
-            continue
-
-        img_url = extract_og_image(html)
-        if not img_url:
+    # Page fetches are I/O-bound, so run them on a small thread pool. Progress
+    # advances as pages finish; results are then read back in URL order.
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        futures = [executor.submit(resolve_episode_art, url, url_map) for url in episode_urls]
+        for _ in tqdm(as_completed(futures), total=len(futures), desc="Fetching metadata",
+                      mininterval=PROGRESS_INTERVAL):
+            pass
+        results = [future.result() for future in futures]
+
+    for url, (source, img_url, ep_num) in zip(episode_urls, results):
+        if source == "no_image":
             no_image.append(url)
-            continue
-
-        # Try to get episode number from image filename first
-        ep_num = parse_episode_number_from_filename(img_url)
-        if ep_num is not None:
+        elif source == "no_number":
+            no_number.append((url, img_url))
+        elif source == "filename":
             from_filename += 1
-            image_data.append((img_url, ep_num))
-            time.sleep(DOWNLOAD_DELAY)
-            continue
-
-        # Fallback 1: fetch more content and look for "EPISODE XXX" in body
-        full_html = fetch_page_html(url, full_page=True)
-        if full_html:
-            ep_num = parse_episode_number_from_content(full_html)
-            if ep_num is not None:
-                from_content += 1
-                image_data.append((img_url, ep_num))
-                time.sleep(DOWNLOAD_DELAY)
-                continue
+        elif source == "content":
+            from_content += 1
+        elif source == "db":
+            from_db += 1
 
-        # Fallback 2: look up episode number from database URL
-        ep_num = get_episode_from_db_url(url, url_map)
         if ep_num is not None:
-            from_db += 1
             image_data.append((img_url, ep_num))
-            time.sleep(DOWNLOAD_DELAY)
-            continue
-
-        # Still no number found
-        no_number.append((url, img_url))
-        time.sleep(DOWNLOAD_DELAY)
 
     print(f"\nFound {len(image_data)} episodes with numbered artwork")
     print(f"  - From filename: {from_filename}")
@@ -331,21 +405,30 @@ def download_episode_art(output_dir: Path):
     skipped = 0
     errors = 0
 
-    for img_url, ep_num in tqdm(image_data, desc="Downloading"):
-        ext = get_file_extension(img_url)
-        output_path = output_dir / f"ep_{ep_num}{ext}"
+    # One directory listing instead of a stat() per image
+    existing = {entry.name for entry in os.scandir(output_dir)}
+
+    pending = []  # (img_url, output_path) still to download
+    for img_url, ep_num in image_data:
+        filename = f"ep_{ep_num}{get_file_extension(img_url)}"
+        output_path = output_dir / filename
 
         # Skip if already downloaded
-        if output_path.exists():
+        if filename in existing:
             skipped += 1
             continue
 
-        if download_image(img_url, output_path):
-            downloaded += 1
-        else:
-            errors += 1
-
-        time.sleep(DOWNLOAD_DELAY)
+        pending.append((img_url, output_path))
+
+    # Downloads are I/O-bound, so threads overlap connection setup and transfer
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = [executor.submit(download_image, img_url, path) for img_url, path in pending]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading",
+                           mininterval=PROGRESS_INTERVAL):
+            if future.result():
+                downloaded += 1
+            else:
+                errors += 1
 
     # Summary
     print(f"\n{'='*50}")
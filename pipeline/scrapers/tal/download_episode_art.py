@@ -12,19 +12,26 @@ Usage:
 """
 
 import argparse
+import asyncio
 import json
+import os
 import re
 import sys
-import time
 from pathlib import Path
-from typing import Optional, Tuple
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+from typing import List, Optional, Tuple
+
+import httpx
 
 # Default paths
 FETCHED_DIR = Path(__file__).parent / "fetched" / "tal"
 OUTPUT_DIR = Path(__file__).parent / "tal-episode-art"
 
+MAX_CONCURRENT = 8       # Parallel image downloads
+DOWNLOAD_TIMEOUT = 30    # seconds per request
+CHUNK_SIZE = 64 * 1024   # bytes per write when streaming images to disk
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp'})
+EPISODE_URL_RE = re.compile(r'thisamericanlife\.org/(\d+)/')
+
 
 def extract_episode_number(url: str) -> Optional[int]:
     """
@@ -35,7 +42,7 @@ def extract_episode_number(url: str) -> Optional[int]:
         https://www.thisamericanlife.org/347/matchmakers → 347
         https://www.thisamericanlife.org/1/new-beginnings → 1
     """
-    match = re.search(r'thisamericanlife\.org/(\d+)/', url)
+    match = EPISODE_URL_RE.search(url)
     if match:
         return int(match.group(1))
     return None
@@ -50,24 +57,82 @@ def get_image_url(metadata: dict) -> Optional[str]:
     return None
 
 
-def download_image(url: str, output_path: Path) -> Tuple[bool, str]:
+class RateLimiter:
+    """Space out request starts by a minimum interval, shared across tasks."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next_start > now:
+                await asyncio.sleep(self._next_start - now)
+            self._next_start = max(now, self._next_start) + self.interval
+
+
+async def download_image(
+    client: httpx.AsyncClient,
+    url: str,
+    output_path: Path,
+    semaphore: asyncio.Semaphore,
+    limiter: RateLimiter,
+) -> Tuple[bool, str]:
     """
     Download image from URL to output path.
 
     Returns (success, message) tuple.
     """
-    try:
-        req = Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urlopen(req, timeout=30) as response:
-            content = response.read()
-            output_path.write_bytes(content)
-            return True, f"Downloaded ({len(content) // 1024}KB)"
-    except HTTPError as e:
-        return False, f"HTTP {e.code}"
-    except URLError as e:
-        return False, f"URL Error: {e.reason}"
-    except Exception as e:
-        return False, f"Error: {str(e)}"
+    # Written to a .part file and renamed when complete: a partial ep_N file
+    # (even from Ctrl-C or cancellation) would be skipped as "exists" next run
+    part_path = output_path.with_name(output_path.name + ".part")
+    async with semaphore:
+        await limiter.wait()
+        try:
+            # Stream to disk in chunks rather than holding the whole image in memory
+            async with client.stream("GET", url, timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                with open(part_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        f.write(chunk)
+            os.replace(part_path, output_path)
+            return True, f"Downloaded ({output_path.stat().st_size // 1024}KB)"
+        except Exception as e:
+            part_path.unlink(missing_ok=True)
+            if isinstance(e, httpx.HTTPStatusError):
+                return False, f"HTTP {e.response.status_code}"
+            if isinstance(e, httpx.RequestError):
+                return False, f"Request Error: {e}"
+            return False, f"Error: {str(e)}"
+
+
+async def download_all(
+    downloads: List[Tuple[int, int, str, Path]],
+    total: int,
+    delay: float,
+    stats: dict,
+):
+    """Download (i, episode_num, image_url, output_path) jobs concurrently, updating stats."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    limiter = RateLimiter(delay)
+
+    async with httpx.AsyncClient(
+        headers={'User-Agent': 'Mozilla/5.0'},
+        follow_redirects=True,
+    ) as client:
+        async def run(i: int, episode_num: int, image_url: str, output_path: Path):
+            success, msg = await download_image(client, image_url, output_path, semaphore, limiter)
+            if success:
+                stats['success'] += 1
+                print(f"[{i}/{total}] ep_{episode_num}: {msg}")
+            else:
+                stats['failed'] += 1
+                stats['errors'].append(f"ep_{episode_num}: {msg}")
+                print(f"[{i}/{total}] ep_{episode_num}: FAILED - {msg}")
+
+        await asyncio.gather(*(run(*job) for job in downloads))
 
 
 def process_json_files(
@@ -108,6 +173,12 @@ def process_json_files(
         print("DRY RUN - no files will be downloaded")
     print()
 
+    # One directory listing instead of a stat() per episode
+    existing = {entry.name for entry in os.scandir(output_dir)} if output_dir.exists() else set()
+
+    # (i, episode_num, image_url, output_path) for every image still to download
+    downloads = []
+
     for i, json_path in enumerate(json_files, 1):
         try:
             with open(json_path) as f:
@@ -135,13 +206,14 @@ def process_json_files(
 
         # Determine output filename
         # Get extension from URL or default to jpg
-        ext = Path(image_url).suffix.lower()
-        if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+        ext = os.path.splitext(image_url)[1].lower()
+        if ext not in IMAGE_EXTENSIONS:
             ext = '.jpg'
-        output_path = output_dir / f"ep_{episode_num}{ext}"
+        filename = f"ep_{episode_num}{ext}"
+        output_path = output_dir / filename
 
         # Check if already exists
-        if output_path.exists():
+        if filename in existing:
             stats['skipped_exists'] += 1
             print(f"[{i}/{len(json_files)}] ep_{episode_num}: Exists, skipping")
             continue
@@ -151,17 +223,14 @@ def process_json_files(
             print(f"[{i}/{len(json_files)}] ep_{episode_num}: Would download from {image_url[:60]}...")
             stats['success'] += 1
         else:
-            success, msg = download_image(image_url, output_path)
-            if success:
-                stats['success'] += 1
-                print(f"[{i}/{len(json_files)}] ep_{episode_num}: {msg}")
-            else:
-                stats['failed'] += 1
-                stats['errors'].append(f"ep_{episode_num}: {msg}")
-                print(f"[{i}/{len(json_files)}] ep_{episode_num}: FAILED - {msg}")
+            downloads.append((i, episode_num, image_url, output_path))
+            # Downloads run concurrently, so another file for the same episode
+            # must see this one as existing rather than write the same path
+            existing.add(filename)
 
-            # Rate limiting
-            time.sleep(delay)
+    # Downloads run concurrently; delay now spaces out request starts
+    if downloads:
+        asyncio.run(download_all(downloads, len(json_files), delay, stats))
 
     return stats
 
@@ -191,7 +260,7 @@ def main():
         "--delay",
         type=float,
         default=0.2,
-        help="Delay between downloads in seconds. Default: 0.2"
+        help="Minimum delay between download starts in seconds. Default: 0.2"
     )
 
     args = parser.parse_args()
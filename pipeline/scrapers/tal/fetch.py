@@ -32,6 +32,20 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+# Optional: HTTP/2 lets the concurrent requests share one connection (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Optional: orjson writes the indented episode JSON several times faster
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -39,6 +53,7 @@ from dotenv import load_dotenv
 MAX_CONCURRENT = 5  # Firecrawl hobby tier limit
 FIRECRAWL_TIMEOUT = 30  # seconds per request
 OUTPUT_DIR = Path(__file__).parent / "fetched" / "tal"
+INDEX_FILE = OUTPUT_DIR / "_index.txt"  # Fetched IDs + the directory mtime they're valid for
 
 # =============================================================================
 # Database
@@ -56,36 +71,66 @@ def get_unscraped_episodes(limit: int = None) -> list[dict]:
     """Get episodes that haven't been scraped yet."""
     conn = get_db_connection()
     try:
-        with conn.cursor() as cur:
-            sql = """
+        # Plain tuple cursor: only two columns, so build the dicts directly
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+            # LIMIT NULL means no limit in Postgres
+            cur.execute("""
                 SELECT id, url
                 FROM episodes
                 WHERE show_id = 2 AND scraped_at IS NULL AND url IS NOT NULL
                 ORDER BY id
-            """
-            if limit:
-                sql += f" LIMIT {limit}"
-            cur.execute(sql)
-            return [dict(row) for row in cur.fetchall()]
+                LIMIT %s
+            """, (limit or None,))
+            return [{"id": episode_id, "url": url} for episode_id, url in cur.fetchall()]
     finally:
         conn.close()
 
 
 def get_already_fetched() -> set[int]:
-    """Get episode IDs that already have JSON files."""
+    """
+    Get episode IDs that already have JSON files.
+
+    Reads the index saved by the last run if the directory hasn't changed
+    since (adding or removing any file, e.g. via scrape_missing.py, bumps
+    the directory mtime); otherwise rescans the directory and rebuilds it.
+    """
     if not OUTPUT_DIR.exists():
         return set()
 
+    try:
+        recorded_mtime, *ids = INDEX_FILE.read_text().split()
+        if int(recorded_mtime) == OUTPUT_DIR.stat().st_mtime_ns:
+            return {int(i) for i in ids}
+    except (OSError, ValueError):
+        pass
+
+    # scandir yields names without building a Path per entry
     fetched = set()
-    for f in OUTPUT_DIR.glob("*.json"):
-        try:
-            episode_id = int(f.stem)
-            fetched.add(episode_id)
-        except ValueError:
-            pass
+    with os.scandir(OUTPUT_DIR) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                fetched.add(int(entry.name[:-len(".json")]))
+            except ValueError:
+                pass
+
+    save_fetched_index(fetched)
     return fetched
 
 
+def save_fetched_index(fetched: set[int]):
+    """Record fetched IDs along with the current directory mtime."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    # Create the file first: adding its directory entry changes the mtime we record
+    INDEX_FILE.touch()
+    dir_mtime = OUTPUT_DIR.stat().st_mtime_ns
+    # Rewriting an existing file in place leaves the directory mtime alone
+    with open(INDEX_FILE, "w") as f:
+        f.write(f"{dir_mtime}\n")
+        f.writelines(f"{episode_id}\n" for episode_id in sorted(fetched))
+
+
 # =============================================================================
 # Firecrawl
 # =============================================================================
@@ -148,6 +193,9 @@ def save_result(result: dict):
     """Save fetch result to JSON file."""
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     filepath = OUTPUT_DIR / f"{result['db_id']}.json"
+    if HAS_ORJSON:
+        filepath.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        return
     with open(filepath, "w") as f:
         json.dump(result, f, indent=2)
 
@@ -195,6 +243,12 @@ async def main(limit: int = None, dry_run: bool = False):
 
     async with httpx.AsyncClient(
         headers={"Authorization": f"Bearer {api_key}"},
+        http2=HAS_HTTP2,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENT,
+            max_keepalive_connections=MAX_CONCURRENT,
+            keepalive_expiry=60,
+        ),
     ) as client:
         # Process in batches for progress reporting
         batch_size = 20
@@ -210,6 +264,7 @@ async def main(limit: int = None, dry_run: bool = False):
 
             for result in results:
                 save_result(result)
+                already_fetched.add(result["db_id"])
                 if result["success"]:
                     success_count += 1
                 else:
@@ -218,6 +273,8 @@ async def main(limit: int = None, dry_run: bool = False):
 
             print(f"Progress: {i + len(batch)}/{len(episodes)} ({success_count} ok, {error_count} errors)")
 
+    save_fetched_index(already_fetched)
+
     print(f"\nDone! Fetched {success_count} episodes, {error_count} errors")
     print(f"JSON files saved to: {OUTPUT_DIR}")
 
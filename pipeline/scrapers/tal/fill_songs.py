@@ -14,22 +14,70 @@ Usage:
 
 import argparse
 import os
+import pickle
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
 
-# Import parser from tal_parse.py
+# Import parser from parse.py (same directory)
 sys.path.insert(0, str(Path(__file__).parent))
-from tal_parse import parse_episode
+from parse import parse_file
+
+PARSE_CACHE_FILE = ".parse_cache.pkl"  # Parse results for unchanged files, kept next to the JSON
+PROJECT_ENV_FILE = Path(__file__).parent.parent / ".env.local"
+
+
+@dataclass(frozen=True)
+class Config:
+    database_url: str | None
+
+
+@lru_cache(maxsize=1)
+def load_config() -> Config:
+    """Load the project's .env.local once per process."""
+    load_dotenv(PROJECT_ENV_FILE)
+    return Config(
+        database_url=os.getenv("DATABASE_URL"),
+    )
+
+
+def parser_stamp() -> tuple[int, int]:
+    """(mtime_ns, size) of the parser module, so editing it invalidates the parse cache."""
+    st = os.stat(parse_file.__code__.co_filename)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_parse_cache(path: Path) -> dict[int, tuple]:
+    """Load {db_id: (mtime_ns, size, result)}; empty if missing, unreadable or from another parser."""
+    try:
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+    if cache.get("parser") != parser_stamp():
+        return {}
+    return cache["entries"]
+
+
+def save_parse_cache(path: Path, entries: dict[int, tuple]):
+    """Write the parse cache via a temp file, so an interrupted run can't leave it truncated."""
+    part_path = path.with_name(path.name + ".part")
+    with open(part_path, "wb") as f:
+        pickle.dump({"parser": parser_stamp(), "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(part_path, path)
 
 
 def get_db_connection():
     """Connect to Neon database."""
     return psycopg2.connect(
-        os.getenv("DATABASE_URL"),
+        load_config().database_url,
         cursor_factory=RealDictCursor,
     )
 
@@ -37,78 +85,97 @@ def get_db_connection():
 def cleanup_existing_songs(conn) -> int:
     """Strip leading/trailing quotes from all song titles.
 
+    Rows that clean to the same title (same episode and artist) are collapsed
+    to one first, since the unique index would reject the update: an
+    already-clean row is kept if there is one, else the lowest ID.
+
     Returns count of songs cleaned.
     """
     with conn.cursor() as cur:
         # Use REGEXP_REPLACE to strip all quote types (straight and curly)
         cur.execute("""
-            UPDATE songs
-            SET title = REGEXP_REPLACE(
-                REGEXP_REPLACE(title, E'^["\u201c\u201d]+', ''),
-                E'["\u201c\u201d]+$', ''
+            WITH ranked AS (
+                SELECT id, title, cleaned,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY episode_id, artist, cleaned
+                           ORDER BY title = cleaned DESC, id
+                       ) AS rn
+                FROM (
+                    SELECT id, episode_id, artist, title,
+                           REGEXP_REPLACE(
+                               REGEXP_REPLACE(title, E'^["\u201c\u201d]+', ''),
+                               E'["\u201c\u201d]+$', ''
+                           ) AS cleaned
+                    FROM songs
+                ) s
+            ), dropped AS (
+                DELETE FROM songs
+                WHERE id IN (SELECT id FROM ranked WHERE rn > 1 AND title <> cleaned)
             )
-            WHERE title ~ E'^["\u201c\u201d]+' OR title ~ E'["\u201c\u201d]+$'
+            UPDATE songs
+            SET title = r.cleaned
+            FROM ranked r
+            WHERE songs.id = r.id
+            AND r.rn = 1 AND r.title <> r.cleaned
         """)
         return cur.rowcount
 
 
-def fix_has_songs_flags(conn) -> tuple[int, int]:
-    """Fix has_songs_discussed flags to match actual song presence.
+def has_unique_index(conn) -> bool:
+    """Whether the (episode_id, title, artist) unique index the inserts rely on exists.
 
-    Returns (count_set_to_true, count_set_to_false).
+    It's created once by pipeline/migrations/001_songs_unique_index.sql.
     """
     with conn.cursor() as cur:
-        # Set true where songs exist but flag is false
         cur.execute("""
-            UPDATE episodes e SET has_songs_discussed = true
-            WHERE EXISTS (SELECT 1 FROM songs s WHERE s.episode_id = e.id)
-            AND has_songs_discussed = false
-        """)
-        fixed_true = cur.rowcount
-
-        # Set false where no songs exist but flag is true (and not a 404)
-        cur.execute("""
-            UPDATE episodes e SET has_songs_discussed = false
-            WHERE NOT EXISTS (SELECT 1 FROM songs s WHERE s.episode_id = e.id)
-            AND has_songs_discussed = true
-            AND title IS NOT NULL
+            SELECT EXISTS (
+                SELECT 1 FROM pg_index
+                WHERE indexrelid = to_regclass('songs_ep_title_artist_uniq')
+                AND indisvalid
+            ) AS exists
         """)
-        fixed_false = cur.rowcount
+        return cur.fetchone()['exists']
 
-        return fixed_true, fixed_false
 
+def fix_flags_and_remove_duplicates(conn) -> dict:
+    """Fix has_songs_discussed flags and remove duplicate songs in one statement.
 
-def check_duplicates(conn) -> int:
-    """Check for duplicate songs (same episode + title).
+    Flags are set to match actual song presence (false only where the episode
+    is not a 404). Duplicates (same episode + title) are deleted, keeping the
+    one with lowest ID. All CTEs share one snapshot, which is safe here: the
+    dedupe always keeps one row per group, so it never changes whether an
+    episode has songs.
 
-    Returns count of duplicate pairs.
+    Returns dict with fixed_true, fixed_false, dupes (duplicate pairs) and removed.
     """
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT COUNT(*) as cnt FROM (
-                SELECT episode_id, title
-                FROM songs
-                GROUP BY episode_id, title
-                HAVING COUNT(*) > 1
-            ) dupes
-        """)
-        return cur.fetchone()['cnt']
-
-
-def remove_duplicates(conn) -> int:
-    """Remove duplicate songs, keeping the one with lowest ID.
-
-    Returns count of songs deleted.
-    """
-    with conn.cursor() as cur:
-        cur.execute("""
-            DELETE FROM songs a
-            USING songs b
-            WHERE a.id > b.id
-            AND a.episode_id = b.episode_id
-            AND a.title = b.title
+            WITH flags_true AS (
+                UPDATE episodes e SET has_songs_discussed = true
+                WHERE EXISTS (SELECT 1 FROM songs s WHERE s.episode_id = e.id)
+                AND has_songs_discussed = false
+                RETURNING 1
+            ), flags_false AS (
+                UPDATE episodes e SET has_songs_discussed = false
+                WHERE NOT EXISTS (SELECT 1 FROM songs s WHERE s.episode_id = e.id)
+                AND has_songs_discussed = true
+                AND title IS NOT NULL
+                RETURNING 1
+            ), deduped AS (
+                DELETE FROM songs a
+                USING songs b
+                WHERE a.id > b.id
+                AND a.episode_id = b.episode_id
+                AND a.title = b.title
+                RETURNING a.episode_id, a.title
+            )
+            SELECT
+                (SELECT COUNT(*) FROM flags_true) AS fixed_true,
+                (SELECT COUNT(*) FROM flags_false) AS fixed_false,
+                (SELECT COUNT(DISTINCT (episode_id, title)) FROM deduped) AS dupes,
+                (SELECT COUNT(*) FROM deduped) AS removed
         """)
-        return cur.rowcount
+        return dict(cur.fetchone())
 
 
 def get_existing_songs(conn, db_ids: list[int]) -> dict[int, set[tuple]]:
@@ -119,21 +186,28 @@ def get_existing_songs(conn, db_ids: list[int]) -> dict[int, set[tuple]]:
     if not db_ids:
         return {}
 
-    with conn.cursor() as cur:
+    # Grouped server-side: one row per episode, plain tuples instead of a dict per song
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
         cur.execute("""
-            SELECT episode_id, title, artist
+            SELECT episode_id, array_agg(ARRAY[title, artist])
             FROM songs
             WHERE episode_id = ANY(%s)
+            GROUP BY episode_id
         """, (db_ids,))
 
-        result = {}
-        for row in cur.fetchall():
-            ep_id = row['episode_id']
-            if ep_id not in result:
-                result[ep_id] = set()
-            result[ep_id].add((row['title'], row['artist']))
+        return {ep_id: set(map(tuple, songs)) for ep_id, songs in cur.fetchall()}
+
 
-        return result
+def iter_missing_songs(parsed_data: list[dict], existing_songs: dict[int, set[tuple]]) -> Iterator[tuple]:
+    """Yield parsed songs not yet in the database, as (episode_id, title, artist)."""
+    for ep in parsed_data:
+        db_id = ep['db_id']
+        existing = existing_songs.get(db_id, set())
+
+        for song in ep['songs']:
+            key = (song['title'], song['artist'])
+            if key not in existing:
+                yield db_id, song['title'], song['artist']
 
 
 def get_episodes_needing_flag_update(conn, db_ids: list[int]) -> list[int]:
@@ -160,34 +234,64 @@ def main():
                         help="Directory containing JSON files")
     args = parser.parse_args()
 
-    # Load env
     script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    load_dotenv(project_root / ".env.local")
 
     base_dir = script_dir / args.dir
 
+    # One directory listing for the available files instead of a glob + stat() per id
+    available = {}
+    if base_dir.is_dir():
+        with os.scandir(base_dir) as entries:
+            available = {
+                int(entry.name[:-5]): entry for entry in entries
+                if entry.name.endswith(".json") and entry.name[:-5].isdigit()
+            }
+
     # Determine file range
     if args.range:
         start, end = args.range
-        db_ids = list(range(start, end + 1))
+        db_ids = sorted(db_id for db_id in available if start <= db_id <= end)
     else:
         # All files
-        db_ids = sorted(int(f.stem) for f in base_dir.glob("*.json"))
+        db_ids = sorted(available)
 
     print(f"Processing {len(db_ids)} files...")
 
-    # Parse all files
+    # Reuse cached results for files whose mtime and size haven't changed
+    cache_path = base_dir / PARSE_CACHE_FILE
+    cache = load_parse_cache(cache_path)
+    results = {}
+    to_parse = []  # (db_id, (mtime_ns, size))
+    for db_id in db_ids:
+        st = available[db_id].stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = cache.get(db_id)
+        if cached and cached[:2] == stamp:
+            results[db_id] = cached[2]
+        else:
+            to_parse.append((db_id, stamp))
+
+    if len(to_parse) < len(db_ids):
+        print(f"  Reusing {len(db_ids) - len(to_parse)} cached parses of unchanged files")
+
+    # Parse the rest; each is independent JSON + regex work, so fan out across cores
+    if to_parse:
+        filepaths = [base_dir / f"{db_id}.json" for db_id, _ in to_parse]
+        with ProcessPoolExecutor() as executor:
+            parsed = executor.map(parse_file, filepaths, chunksize=16)
+            for (db_id, stamp), result in zip(to_parse, parsed):
+                results[db_id] = result
+                if 'error' not in result:
+                    cache[db_id] = (*stamp, result)
+        save_parse_cache(cache_path, cache)
+
     parsed_data = []
     for db_id in db_ids:
-        filepath = base_dir / f"{db_id}.json"
-        if filepath.exists():
-            try:
-                result = parse_episode(filepath)
-                if not result.get('is_404') and result.get('songs'):
-                    parsed_data.append(result)
-            except Exception as e:
-                print(f"  Error parsing {db_id}: {e}")
+        result = results[db_id]
+        if 'error' in result:
+            print(f"  Error parsing {result['db_id']}: {result['error']}")
+        elif not result.get('is_404') and result.get('songs'):
+            parsed_data.append(result)
 
     print(f"Found {len(parsed_data)} episodes with songs")
 
@@ -195,42 +299,40 @@ def main():
     total_parsed_songs = sum(len(ep['songs']) for ep in parsed_data)
     print(f"Total songs in parsed data: {total_parsed_songs}")
 
-    # Connect to DB and find missing songs
+    # Connect to DB
     conn = get_db_connection()
     try:
-        episode_ids = [ep['db_id'] for ep in parsed_data]
-        existing_songs = get_existing_songs(conn, episode_ids)
-
-        # Count existing
-        total_existing = sum(len(songs) for songs in existing_songs.values())
-        print(f"Songs already in database: {total_existing}")
-
-        # Find missing songs
-        missing_songs = []  # [(episode_id, title, artist), ...]
-        for ep in parsed_data:
-            db_id = ep['db_id']
-            existing = existing_songs.get(db_id, set())
-
-            for song in ep['songs']:
-                key = (song['title'], song['artist'])
-                if key not in existing:
-                    missing_songs.append((db_id, song['title'], song['artist']))
-
-        print(f"Missing songs to insert: {len(missing_songs)}")
-
-        # Find episodes needing flag update
-        eps_with_songs = [ep['db_id'] for ep in parsed_data]
-        eps_needing_update = get_episodes_needing_flag_update(conn, eps_with_songs)
-        print(f"Episodes needing has_songs_discussed=true: {len(eps_needing_update)}")
-
         if not args.execute:
+            # Preview only: diff against what's stored. The execute path skips
+            # this read and lets the unique index reject songs already present.
+            episode_ids = [ep['db_id'] for ep in parsed_data]
+            existing_songs = get_existing_songs(conn, episode_ids)
+
+            # Count existing
+            total_existing = sum(len(songs) for songs in existing_songs.values())
+            print(f"Songs already in database: {total_existing}")
+
+            # Find missing songs
+            # Count them in one pass, keeping only the sample that gets printed
+            sample_missing = []
+            missing_count = 0
+            for song in iter_missing_songs(parsed_data, existing_songs):
+                missing_count += 1
+                if len(sample_missing) < 10:
+                    sample_missing.append(song)
+            print(f"Missing songs to insert: {missing_count}")
+
+            # Find episodes needing flag update
+            eps_needing_update = get_episodes_needing_flag_update(conn, episode_ids)
+            print(f"Episodes needing has_songs_discussed=true: {len(eps_needing_update)}")
+
             print("\n--- DRY RUN (use --execute to insert) ---")
-            if missing_songs:
+            if sample_missing:
                 print("\nSample missing songs (first 10):")
-                for ep_id, title, artist in missing_songs[:10]:
+                for ep_id, title, artist in sample_missing:
                     print(f"  [{ep_id}] \"{title}\" by {artist}")
-                if len(missing_songs) > 10:
-                    print(f"  ... and {len(missing_songs) - 10} more")
+                if missing_count > 10:
+                    print(f"  ... and {missing_count - 10} more")
 
             if eps_needing_update:
                 print(f"\nEpisodes to update: {eps_needing_update[:20]}")
@@ -239,6 +341,11 @@ def main():
             return
 
         # Execute changes
+        if not has_unique_index(conn):
+            print("Error: unique index songs_ep_title_artist_uniq not found.")
+            print("  Run once: psql \"$DATABASE_URL\" -f pipeline/migrations/001_songs_unique_index.sql")
+            sys.exit(1)
+
         print("\n--- EXECUTING ---")
 
         # Phase 1: Clean existing song titles
@@ -246,46 +353,38 @@ def main():
         cleaned = cleanup_existing_songs(conn)
         print(f"  Cleaned {cleaned} song titles (stripped quotes)")
 
-        # Phase 2: Re-query existing songs (now that they're cleaned)
-        existing_songs = get_existing_songs(conn, episode_ids)
-        total_existing = sum(len(songs) for songs in existing_songs.values())
-        print(f"  Songs in DB after cleanup: {total_existing}")
-
-        # Re-calculate missing songs
-        missing_songs = []
-        for ep in parsed_data:
-            db_id = ep['db_id']
-            existing = existing_songs.get(db_id, set())
-            for song in ep['songs']:
-                key = (song['title'], song['artist'])
-                if key not in existing:
-                    missing_songs.append((db_id, song['title'], song['artist']))
-
-        # Phase 3: Insert missing songs
+        # Phase 2: Insert every parsed song; ones already stored hit the unique index
+        all_songs = [
+            (ep['db_id'], song['title'], song['artist'])
+            for ep in parsed_data
+            for song in ep['songs']
+        ]
         print(f"\nPhase 2: Inserting missing songs...")
-        if missing_songs:
-            with conn.cursor() as cur:
-                cur.executemany(
-                    "INSERT INTO songs (episode_id, title, artist) VALUES (%s, %s, %s)",
-                    missing_songs
-                )
-            print(f"  Inserted {len(missing_songs)} songs")
+        with conn.cursor() as cur:
+            # Multi-row INSERTs, 1000 rows per statement; RETURNING counts rows across pages
+            inserted = execute_values(
+                cur,
+                """
+                INSERT INTO songs (episode_id, title, artist) VALUES %s
+                ON CONFLICT (episode_id, title, artist) DO NOTHING
+                RETURNING 1
+                """,
+                all_songs,
+                page_size=1000,
+                fetch=True,
+            )
+        if inserted:
+            print(f"  Inserted {len(inserted)} songs")
         else:
             print("  No missing songs to insert")
 
-        # Phase 4: Fix has_songs_discussed flags
-        print(f"\nPhase 3: Fixing has_songs_discussed flags...")
-        fixed_true, fixed_false = fix_has_songs_flags(conn)
-        print(f"  Set {fixed_true} episodes to has_songs=true")
-        print(f"  Set {fixed_false} episodes to has_songs=false")
-
-        # Phase 5: Check for and remove duplicates
-        print(f"\nPhase 4: Checking for duplicates...")
-        dupes = check_duplicates(conn)
-        if dupes > 0:
-            print(f"  Found {dupes} duplicate song pairs, removing...")
-            removed = remove_duplicates(conn)
-            print(f"  Removed {removed} duplicate songs")
+        # Phase 3: Fix has_songs_discussed flags and remove duplicates, one round trip
+        print(f"\nPhase 3: Fixing has_songs_discussed flags and duplicates...")
+        fixes = fix_flags_and_remove_duplicates(conn)
+        print(f"  Set {fixes['fixed_true']} episodes to has_songs=true")
+        print(f"  Set {fixes['fixed_false']} episodes to has_songs=false")
+        if fixes['removed']:
+            print(f"  Removed {fixes['removed']} duplicate songs ({fixes['dupes']} duplicate pairs)")
         else:
             print("  No duplicates found")
 
@@ -16,20 +16,92 @@ import json
 import os
 import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 import psycopg2
 import requests
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# Optional: orjson decodes Firecrawl responses and writes the indented episode JSON several times faster
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+MAX_WORKERS = 8          # Episodes processed concurrently
+API_INTERVAL = 0.3       # Minimum seconds between Firecrawl request starts
+
+# Firecrawl reports the page's HTTP status as "statusCode" in the response metadata.
+# Quotes inside the markdown string are escaped, so this only matches that key.
+NOT_FOUND_RE = re.compile(rb'"statusCode"\s*:\s*404\b')
+NOT_FOUND_RESPONSE = {"success": True, "data": {"metadata": {"statusCode": 404}}}
+
+PROJECT_ENV_FILE = Path(__file__).parent.parent / ".env.local"
+
+
+@dataclass(frozen=True)
+class Config:
+    database_url: str | None
+    firecrawl_api_key: str | None
+
+
+@lru_cache(maxsize=1)
+def load_config() -> Config:
+    """Load the project's .env.local once per process."""
+    load_dotenv(PROJECT_ENV_FILE)
+    return Config(
+        database_url=os.getenv("DATABASE_URL"),
+        firecrawl_api_key=os.getenv("FIRECRAWL_API_KEY"),
+    )
+
+
+class RateLimiter:
+    """Space out request starts by a minimum interval. Safe to share between threads."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        # Reserve a start slot under the lock, then sleep outside it
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def make_session() -> requests.Session:
+    """Shared session: keep-alive connections to the Firecrawl API, retries on transient errors."""
+    session = requests.Session()
+    # Firecrawl calls are all POSTs, which urllib3 doesn't retry unless told to
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503],
+                  allowed_methods=frozenset({"POST"}))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = make_session()
+LIMITER = RateLimiter(API_INTERVAL)
+
 
 def get_db_connection():
     """Connect to Neon database."""
     return psycopg2.connect(
-        os.getenv("DATABASE_URL"),
+        load_config().database_url,
         cursor_factory=RealDictCursor,
     )
 
@@ -41,25 +113,16 @@ def get_404_episodes(conn, skip_after_episode: int = 877) -> list[dict]:
         skip_after_episode: Skip episodes with numbers > this value (for cron testing)
     """
     with conn.cursor() as cur:
+        # Cutoff applied in SQL so skipped rows never leave the database
         cur.execute("""
             SELECT id, url,
-                   SUBSTRING(url FROM '/([0-9]+)/') as episode_number
+                   SUBSTRING(url FROM '/([0-9]+)/')::int as episode_number
             FROM episodes
             WHERE show_id = 2 AND title IS NULL
+            AND COALESCE(SUBSTRING(url FROM '/([0-9]+)/')::int, 0) <= %s
             ORDER BY id
-        """)
-        episodes = cur.fetchall()
-
-    # Filter out episodes after the cutoff
-    filtered = []
-    for ep in episodes:
-        ep_num = int(ep['episode_number']) if ep['episode_number'] else 0
-        if ep_num <= skip_after_episode:
-            filtered.append(ep)
-        else:
-            print(f"  Skipping episode {ep_num} (after cutoff {skip_after_episode})")
-
-    return filtered
+        """, (skip_after_episode,))
+        return cur.fetchall()
 
 
 def search_tal_episode(episode_number: str, api_key: str) -> str | None:
@@ -78,7 +141,8 @@ def search_tal_episode(episode_number: str, api_key: str) -> str | None:
     }
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        LIMITER.wait()
+        response = SESSION.post(url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
         data = response.json()
 
@@ -128,9 +192,16 @@ def scrape_url(url: str, api_key: str) -> dict | None:
     }
 
     try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=60)
+        LIMITER.wait()
+        response = SESSION.post(api_url, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
-        data = response.json()
+        raw = response.content
+        # 404 pages are dropped by the caller, so skip decoding their markdown
+        if NOT_FOUND_RE.search(raw):
+            data = NOT_FOUND_RESPONSE
+        else:
+            # Scrape payloads carry the full markdown; orjson decodes the raw bytes directly
+            data = orjson.loads(raw) if HAS_ORJSON else json.loads(raw)
 
         if data.get("success"):
             return data.get("data", {})
@@ -141,7 +212,7 @@ def scrape_url(url: str, api_key: str) -> dict | None:
 
 
 def save_json(db_id: int, url: str, scraped_data: dict, output_dir: Path):
-    """Save scraped data to JSON file."""
+    """Save scraped data to JSON file, via a temp file so a killed run can't leave it truncated."""
     json_data = {
         "db_id": db_id,
         "url": url,
@@ -152,19 +223,67 @@ def save_json(db_id: int, url: str, scraped_data: dict, output_dir: Path):
     }
 
     filepath = output_dir / f"{db_id}.json"
-    with open(filepath, 'w') as f:
-        json.dump(json_data, f, indent=2)
+    # A half-written {db_id}.json would count as already fetched; the .part name never does
+    part_path = filepath.with_name(filepath.name + ".part")
+    if HAS_ORJSON:
+        part_path.write_bytes(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(part_path, 'w') as f:
+            json.dump(json_data, f, indent=2)
+    os.replace(part_path, filepath)
 
     return filepath
 
 
-def update_db_url(conn, db_id: int, new_url: str):
-    """Update episode URL in database."""
+def process_episode(ep: dict, api_key: str) -> tuple[str | None, dict | None, list[str]]:
+    """Find a working URL for a 404 episode and scrape it.
+
+    Runs in a worker thread, so progress lines are returned rather than printed.
+    Returns (final_url, scraped, log); final_url and scraped are None on failure.
+    """
+    ep_num = ep['episode_number']
+    old_url = ep['url']
+    log = []
+
+    # Strategy 1: Try existing URL first (many were just temporary 404s)
+    scraped = try_existing_url(old_url, api_key)
+    if scraped:
+        log.append("  ✅ Existing URL works now")
+        return old_url, scraped, log
+
+    # Strategy 2: Search for correct URL
+    log.append("  Existing URL still 404, searching...")
+    correct_url = search_tal_episode(ep_num, api_key)
+
+    if not correct_url:
+        log.append("  ❌ Could not find correct URL")
+        return None, None, log
+
+    if correct_url != old_url:
+        log.append(f"  Found different URL: {correct_url}")
+
+    scraped = scrape_url(correct_url, api_key)
+    if not scraped:
+        log.append("  ❌ Scrape failed")
+        return None, None, log
+
+    # Check if it's actually a 404
+    status = scraped.get("metadata", {}).get("statusCode", 200)
+    if status == 404:
+        log.append("  ❌ Page returned 404")
+        return None, None, log
+
+    return correct_url, scraped, log
+
+
+def update_db_urls(conn, updates: list[tuple[str, int]]):
+    """Update episode URLs in database from [(new_url, db_id), ...] in one statement."""
     with conn.cursor() as cur:
-        cur.execute(
-            "UPDATE episodes SET url = %s WHERE id = %s",
-            (new_url, db_id)
-        )
+        execute_values(cur, """
+            UPDATE episodes SET url = data.url
+            FROM (VALUES %s) AS data(url, id)
+            WHERE episodes.id = data.id
+        """, updates)
 
 
 def main():
@@ -181,12 +300,9 @@ def main():
                         help="Skip episodes after this number (default: 877)")
     args = parser.parse_args()
 
-    # Load env
     script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    load_dotenv(project_root / ".env.local")
 
-    api_key = os.getenv("FIRECRAWL_API_KEY")
+    api_key = load_config().firecrawl_api_key
     if not api_key:
         print("Error: FIRECRAWL_API_KEY not found in environment")
         sys.exit(1)
@@ -210,70 +326,47 @@ def main():
         fixed = 0
         failed = 0
         skipped = 0
+        url_updates = []  # (new_url, db_id), written in one UPDATE after the loop
 
-        for i, ep in enumerate(episodes, 1):
-            db_id = ep['id']
-            ep_num = ep['episode_number']
-            old_url = ep['url']
-
-            print(f"[{i}/{len(episodes)}] Episode {ep_num} (db_id: {db_id})")
-            print(f"  URL: {old_url}")
-
-            if not args.execute:
+        if not args.execute:
+            for i, ep in enumerate(episodes, 1):
+                print(f"[{i}/{len(episodes)}] Episode {ep['episode_number']} (db_id: {ep['id']})")
+                print(f"  URL: {ep['url']}")
                 print(f"  [DRY RUN] Would try existing URL, then search if needed")
                 fixed += 1
-                continue
-
-            # Strategy 1: Try existing URL first (many were just temporary 404s)
-            scraped = try_existing_url(old_url, api_key)
-            final_url = old_url
-
-            if scraped:
-                print(f"  ✅ Existing URL works now")
-            else:
-                # Strategy 2: Search for correct URL
-                print(f"  Existing URL still 404, searching...")
-                correct_url = search_tal_episode(ep_num, api_key)
-
-                if not correct_url:
-                    print(f"  ❌ Could not find correct URL")
-                    failed += 1
-                    time.sleep(0.3)
-                    continue
-
-                if correct_url != old_url:
-                    print(f"  Found different URL: {correct_url}")
-
-                scraped = scrape_url(correct_url, api_key)
-                final_url = correct_url
-
-                if not scraped:
-                    print(f"  ❌ Scrape failed")
-                    failed += 1
-                    time.sleep(0.3)
-                    continue
-
-                # Check if it's actually a 404
-                status = scraped.get("metadata", {}).get("statusCode", 200)
-                if status == 404:
-                    print(f"  ❌ Page returned 404")
-                    failed += 1
-                    time.sleep(0.3)
-                    continue
-
-            # Save JSON
-            filepath = save_json(db_id, final_url, scraped, output_dir)
-            print(f"  ✅ Saved to {filepath.name}")
-
-            # Update DB if URL changed
-            if final_url != old_url:
-                update_db_url(conn, db_id, final_url)
-                print(f"  ✅ Updated URL in database")
-
-            fixed += 1
-
-            # Rate limiting - be nice to the API
-            time.sleep(0.3)
+        else:
+            # Episodes run concurrently; LIMITER spaces out the Firecrawl calls across
+            # threads. Files and DB updates stay on the main thread's connection.
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                futures = {executor.submit(process_episode, ep, api_key): ep for ep in episodes}
+
+                for i, future in enumerate(as_completed(futures), 1):
+                    ep = futures[future]
+                    db_id = ep['id']
+                    final_url, scraped, log = future.result()
+
+                    print(f"[{i}/{len(episodes)}] Episode {ep['episode_number']} (db_id: {db_id})")
+                    print(f"  URL: {ep['url']}")
+                    for line in log:
+                        print(line)
+
+                    if not scraped:
+                        failed += 1
+                        continue
+
+                    # Save JSON
+                    filepath = save_json(db_id, final_url, scraped, output_dir)
+                    print(f"  ✅ Saved to {filepath.name}")
+
+                    # Update DB if URL changed
+                    if final_url != ep['url']:
+                        url_updates.append((final_url, db_id))
+
+                    fixed += 1
+
+        if url_updates:
+            update_db_urls(conn, url_updates)
+            print(f"\n✅ Updated {len(url_updates)} URLs in database")
 
         conn.commit()
 
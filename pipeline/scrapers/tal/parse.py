@@ -17,15 +17,64 @@ import sys
 import argparse
 from pathlib import Path
 
+# Optional: orjson decodes the episode JSON several times faster
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Compiled once at import; parse_episode runs them for every file and song section
+EPISODE_NUM_RE = re.compile(r'/(\d+)/')
+TITLE_SUFFIX_RE = re.compile(r' - This American Life$')
+SONG_SECTION_RE = re.compile(r'## Song:\s*\n\n(.+?)(?=\n\n##|\Z)', re.DOTALL)
+SONG_LINK_RE = re.compile(r'\[(["\']?)(.+?)\1\s+by\s+([^\]]+)\]')
+SONG_PLAIN_RE = re.compile(r'"([^"]+)"\s+by\s+(.+?)(?:,\s*performed by|$)')
+ARTIST_PAREN_RE = re.compile(r'\s*\([^)]+\)\s*$')
+
+# 404 pages are recognized from the raw file bytes, without decoding the JSON.
+# Saved episode files start {"db_id": ..., "url": ...} and have "markdown" before "metadata".
+NOT_FOUND_MARKER = b"could not be found"
+FILE_HEADER_RE = re.compile(rb'\{\s*"db_id":\s*(\d+),\s*"url":\s*("(?:[^"\\]|\\.)*")')
+
+# Curly -> straight quotes in one pass (explicit Unicode escapes so the curly quotes are matched)
+QUOTE_TRANSLATION = str.maketrans({'\u201c': '"', '\u201d': '"', '\u2018': "'", '\u2019': "'"})
+
 def clean_quotes(s):
     """Replace curly quotes with straight quotes"""
-    # Use explicit Unicode escapes to ensure curly quotes are matched
-    return s.replace('\u201c', '"').replace('\u201d', '"').replace('\u2018', "'").replace('\u2019', "'")
+    return s.translate(QUOTE_TRANSLATION)
+
+def quick_404(raw):
+    """404 result read straight from the file bytes, or None if a full parse is needed."""
+    # Quotes inside JSON strings are escaped, so these only match the top-level keys
+    start = raw.find(b'"markdown":')
+    end = raw.find(b'"metadata":', start)
+    if start == -1 or end == -1 or raw.find(NOT_FOUND_MARKER, start, end) == -1:
+        return None
+    header = FILE_HEADER_RE.match(raw)
+    if not header:
+        return None
+    return {
+        "db_id": int(header.group(1)),
+        "is_404": True,
+        "url": json.loads(header.group(2))
+    }
+
+def parse_episode(filepath, include_raw=False):
+    """Parse a single episode JSON file.
+
+    The full markdown is only returned (as raw_content) with include_raw=True;
+    most callers just want the songs and metadata.
+    """
+    with open(filepath, 'rb') as f:
+        raw = f.read()
 
-def parse_episode(filepath):
-    """Parse a single episode JSON file."""
-    with open(filepath) as f:
-        data = json.load(f)
+    # 404s are common and need nothing but db_id and url, so skip decoding them
+    not_found = quick_404(raw)
+    if not_found:
+        return not_found
+
+    data = orjson.loads(raw) if HAS_ORJSON else json.loads(raw)
 
     # Check for 404
     if "could not be found" in data.get("markdown", ""):
@@ -36,12 +85,12 @@ def parse_episode(filepath):
         }
 
     # Extract episode number from URL
-    match = re.search(r'/(\d+)/', data["url"])
+    match = EPISODE_NUM_RE.search(data["url"])
     ep_num = int(match.group(1)) if match else None
 
     # Extract title (remove suffix)
     title = data.get("metadata", {}).get("og:title", "")
-    title = re.sub(r' - This American Life$', '', title)
+    title = TITLE_SUFFIX_RE.sub('', title)
     title = clean_quotes(title)
 
     # Extract date
@@ -53,29 +102,28 @@ def parse_episode(filepath):
     markdown = data.get("markdown", "")
 
     # Find all ## Song: sections
-    song_pattern = r'## Song:\s*\n\n(.+?)(?=\n\n##|\Z)'
-    song_sections = re.findall(song_pattern, markdown, re.DOTALL)
+    song_sections = SONG_SECTION_RE.findall(markdown)
 
     for section in song_sections:
         section = clean_quotes(section.strip())
 
         # Format 1: ["Title" by Artist](url) or [Title by Artist](url)
-        match = re.search(r'\[(["\']?)(.+?)\1\s+by\s+([^\]]+)\]', section)
+        match = SONG_LINK_RE.search(section)
         if match:
             song_title = clean_quotes(match.group(2).strip())
-            artist = re.sub(r'\s*\([^)]+\)\s*$', '', match.group(3)).strip()
+            artist = ARTIST_PAREN_RE.sub('', match.group(3)).strip()
             songs.append({"title": song_title, "artist": artist})
             continue
 
         # Format 2: "Title" by Artist (plain text)
-        match = re.search(r'"([^"]+)"\s+by\s+(.+?)(?:,\s*performed by|$)', section)
+        match = SONG_PLAIN_RE.search(section)
         if match:
             songs.append({
                 "title": clean_quotes(match.group(1)),
                 "artist": match.group(2).strip()
             })
 
-    return {
+    result = {
         "db_id": data["db_id"],
         "is_404": False,
         "url": data.get("url", ""),
@@ -84,8 +132,42 @@ def parse_episode(filepath):
         "publish_date": date,
         "has_songs": len(songs) > 0,
         "songs": songs,
-        "raw_content": markdown  # Full markdown for database
     }
+    if include_raw:
+        result["raw_content"] = markdown  # Full markdown for database
+    return result
+
+
+def range_files(start, end, directory="fetched/tal"):
+    """JSON files for db_ids start..end (inclusive) that exist in directory."""
+    base_dir = Path(__file__).parent / directory
+    files = []
+    for db_id in range(start, end + 1):
+        filepath = base_dir / f"{db_id}.json"
+        if filepath.exists():
+            files.append(filepath)
+    return files
+
+
+def parse_file(filepath, include_raw=False):
+    """Parse one episode file, returning an error entry instead of raising."""
+    try:
+        return parse_episode(filepath, include_raw)
+    except Exception as e:
+        return {
+            "db_id": int(filepath.stem) if filepath.stem.isdigit() else None,
+            "error": str(e)
+        }
+
+
+def parse_files(files, include_raw=False):
+    """Parse episode files, recording an error entry for any that fail."""
+    return [parse_file(filepath, include_raw) for filepath in files]
+
+
+def parse_range(start, end, directory="fetched/tal", include_raw=False):
+    """Parse all fetched episodes with db_ids start..end (inclusive)."""
+    return parse_files(range_files(start, end, directory), include_raw)
 
 
 def main():
@@ -97,31 +179,17 @@ def main():
                         help="Directory containing JSON files")
     args = parser.parse_args()
 
-    files = []
-    base_dir = Path(__file__).parent / args.dir
-
     if args.range:
         start, end = args.range
-        for db_id in range(start, end + 1):
-            filepath = base_dir / f"{db_id}.json"
-            if filepath.exists():
-                files.append(filepath)
+        files = range_files(start, end, args.dir)
     elif args.files:
         files = [Path(f) for f in args.files]
     else:
         print("No files specified. Use positional args or --range.", file=sys.stderr)
         sys.exit(1)
 
-    results = []
-    for filepath in files:
-        try:
-            result = parse_episode(filepath)
-            results.append(result)
-        except Exception as e:
-            results.append({
-                "db_id": int(filepath.stem) if filepath.stem.isdigit() else None,
-                "error": str(e)
-            })
+    # Full output for database import, markdown included
+    results = parse_files(files, include_raw=True)
 
     print(json.dumps(results, indent=2))
 
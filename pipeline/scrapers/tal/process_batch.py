@@ -3,17 +3,22 @@
 
 import json
 import sys
-import subprocess
+from pathlib import Path
 
-def main():
-    # Run the parse script and capture output
-    result = subprocess.run(
-        ['python3', '/Users/KevinHG/DevKev/personal/list-maker/scripts/tal_parse.py', '--range', '901', '1000'],
-        capture_output=True,
-        text=True
-    )
+# Optional: faster serialization of large batches
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Parse in-process rather than round-tripping tal_parse output through a subprocess and JSON
+sys.path.insert(0, str(Path(__file__).parent))
+from parse import parse_range
 
-    data = json.loads(result.stdout)
+def main():
+    # parse_range leaves out raw_content by default, so the output needs no filtering
+    data = parse_range(901, 1000)
 
     # Count statistics
     total = len(data)
@@ -29,16 +34,11 @@ def main():
     print(f"Total songs: {total_songs}", file=sys.stderr)
     print(file=sys.stderr)
 
-    # Output the data without raw_content for processing
-    clean_data = []
-    for d in data:
-        clean = {}
-        for k, v in d.items():
-            if k != "raw_content":
-                clean[k] = v
-        clean_data.append(clean)
-
-    print(json.dumps(clean_data, indent=2))
+    if HAS_ORJSON:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+    else:
+        print(json.dumps(data, indent=2))
 
 if __name__ == "__main__":
     main()
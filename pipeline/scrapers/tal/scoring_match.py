@@ -11,43 +11,83 @@ Usage:
 """
 
 import argparse
+import io
+import json
 import os
+import sqlite3
 import sys
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
 
 
+# Credentials and OAuth token cache are shared with spotify-bulk-actions-mcp
+MCP_DIR = Path.home() / "DevKev/personal/spotify-bulk-actions-mcp"
+PROJECT_ENV_FILE = Path(__file__).parent.parent / ".env.local"
+
 # Playlist IDs by show
 PLAYLISTS = {
     2: "3d7fjfrTTKvrl7VHv5JzIz",  # TAL
 }
 
+INITIAL_RPS = 5.0        # Spotify request rate to start at; adapts to 429 feedback
+MIN_RPS = 1.0
+MAX_RPS = 20.0
+SPEEDUP_AFTER = 100      # Consecutive successes before raising the rate 10%
+PAGE_WORKERS = 8         # Concurrent playlist page fetches
+
+SEARCH_CACHE_FILE = ".spotify_search_cache.sqlite"
+SEARCH_CACHE_TTL = 30 * 24 * 3600  # Seconds; the Spotify catalog is stable
+
+
+@dataclass(frozen=True)
+class Config:
+    spotify_client_id: str | None
+    spotify_client_secret: str | None
+    spotify_redirect_uri: str
+    database_url: str | None
+
+
+@lru_cache(maxsize=1)
+def load_config() -> Config:
+    """Load the MCP's .env and the project's .env.local once per process."""
+    load_dotenv(MCP_DIR / ".env")
+    load_dotenv(PROJECT_ENV_FILE)
+    return Config(
+        spotify_client_id=os.getenv("SPOTIFY_CLIENT_ID"),
+        spotify_client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
+        spotify_redirect_uri=os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8080/callback"),
+        database_url=os.getenv("DATABASE_URL"),
+    )
+
 
 def get_db_connection():
     """Connect to Neon database."""
     return psycopg2.connect(
-        os.getenv("DATABASE_URL"),
+        load_config().database_url,
         cursor_factory=RealDictCursor,
     )
 
 
 def get_spotify_client():
     """Initialize Spotify client."""
-    cache_path = os.path.expanduser(
-        "~/DevKev/personal/spotify-bulk-actions-mcp/.spotify_cache/.cache"
-    )
+    config = load_config()
     auth_manager = SpotifyOAuth(
-        client_id=os.getenv("SPOTIFY_CLIENT_ID"),
-        client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
-        redirect_uri=os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8080/callback"),
+        client_id=config.spotify_client_id,
+        client_secret=config.spotify_client_secret,
+        redirect_uri=config.spotify_redirect_uri,
         scope="playlist-modify-public playlist-modify-private",
-        cache_path=cache_path,
+        cache_path=str(MCP_DIR / ".spotify_cache" / ".cache"),
     )
     return spotipy.Spotify(auth_manager=auth_manager)
 
@@ -64,97 +104,321 @@ def get_unmatched_tracks(conn, show_id: int) -> list[dict]:
         return cur.fetchall()
 
 
-def search_spotify(sp, title: str, artist: str) -> dict | None:
-    """Search Spotify for a track. Returns match info or None."""
-    # Try exact search first
-    query = f"track:{title} artist:{artist}"
+class RateLimiter:
+    """
+    Adaptive spacing between Spotify requests.
+
+    Sleeps only if the previous request started less than 1/rps ago. Halves
+    the rate on a 429 and speeds up 10% after each run of SPEEDUP_AFTER
+    successes. Safe to share between threads.
+    """
+
+    def __init__(self, rps: float = INITIAL_RPS):
+        self.rps = rps
+        self._next_start = 0.0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        # Reserve a start slot under the lock, then sleep outside it
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1 / self.rps
+        if start > now:
+            time.sleep(start - now)
+
+    def success(self):
+        self._successes += 1
+        if self._successes >= SPEEDUP_AFTER:
+            self._successes = 0
+            self.rps = min(MAX_RPS, self.rps * 1.1)
+
+    def throttled(self):
+        self._successes = 0
+        self.rps = max(MIN_RPS, self.rps / 2)
+
+
+class SearchCache:
+    """
+    Persistent search_spotify() results, keyed by normalized (title, artist).
+
+    Misses are cached too (as null) so re-runs don't search for them again;
+    search errors aren't cached.
+    """
+
+    MISSING = object()
+
+    def __init__(self, path: str, ttl: float = SEARCH_CACHE_TTL):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                title TEXT NOT NULL,
+                artist TEXT NOT NULL,
+                result TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (title, artist)
+            )
+        """)
+
+    @staticmethod
+    def _key(title: str, artist: str) -> tuple:
+        return title.lower().strip(), artist.lower().strip()
+
+    def get(self, title: str, artist: str):
+        """Return the cached result (possibly None), or MISSING."""
+        row = self.conn.execute(
+            "SELECT result FROM searches WHERE title = ? AND artist = ? AND fetched_at > ?",
+            (*self._key(title, artist), time.time() - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else self.MISSING
+
+    def set(self, title: str, artist: str, result: dict | None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                (*self._key(title, artist), json.dumps(result), time.time()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def search_spotify(
+    sp, title: str, artist: str, limiter: RateLimiter, cache: SearchCache
+) -> dict | None:
+    """Search Spotify (or the search cache) for a track. Returns match info or None."""
+    # scoring_tracks can have NULL titles/artists; nothing to search for without a title
+    if not title:
+        return None
+    artist = artist or ""
+
+    result = cache.get(title, artist)
+    if result is not SearchCache.MISSING:
+        return result
+
     try:
-        results = sp.search(q=query, type="track", limit=5)
-        tracks = results.get("tracks", {}).get("items", [])
+        result = _search_spotify(sp, title, artist, limiter)
+    except Exception as e:
+        if getattr(e, "http_status", None) == 429:
+            limiter.throttled()
+        print(f"  Search error: {e}")
+        return None
 
-        if tracks:
-            track = tracks[0]
-            # Calculate simple confidence based on name match
-            track_name = track["name"].lower()
-            search_title = title.lower()
+    limiter.success()
+
+    cache.set(title, artist, result)
+    return result
 
-            if search_title in track_name or track_name in search_title:
-                confidence = "HIGH"
-            else:
-                confidence = "MEDIUM"
 
-            return {
-                "id": track["id"],
-                "name": track["name"],
-                "artists": [a["name"] for a in track["artists"]],
-                "album": track["album"]["name"],
-                "confidence": confidence,
-            }
+def _track_result(track: dict, confidence: str) -> dict:
+    return {
+        "id": track["id"],
+        "name": track["name"],
+        "artists": [a["name"] for a in track["artists"]],
+        "album": track["album"]["name"],
+        "confidence": confidence,
+    }
 
-        # Try fuzzy search (title only)
-        results = sp.search(q=title, type="track", limit=5)
-        tracks = results.get("tracks", {}).get("items", [])
 
+def _search_spotify(sp, title: str, artist: str, limiter: RateLimiter) -> dict | None:
+    """Query Spotify for a track; search errors propagate."""
+    search_title = title.lower()
+    search_artist = artist.lower()
+
+    # Try exact search first
+    query = f"track:{title} artist:{artist}"
+    limiter.wait()
+    results = sp.search(q=query, type="track", limit=5)
+    tracks = results.get("tracks", {}).get("items", [])
+
+    if tracks:
+        # An exact title + artist hit anywhere in the results wins outright
         for track in tracks:
-            # Check if artist matches loosely
-            track_artists = " ".join(a["name"].lower() for a in track["artists"])
-            if artist.lower().split()[0] in track_artists:
-                return {
-                    "id": track["id"],
-                    "name": track["name"],
-                    "artists": [a["name"] for a in track["artists"]],
-                    "album": track["album"]["name"],
-                    "confidence": "LOW",
-                }
+            if track["name"].lower() == search_title and any(
+                a["name"].lower() == search_artist for a in track["artists"]
+            ):
+                return _track_result(track, "HIGH")
 
-        return None
+        track = tracks[0]
+        # Calculate simple confidence based on name match
+        track_name = track["name"].lower()
 
-    except Exception as e:
-        print(f"  Search error: {e}")
-        return None
+        if search_title in track_name or track_name in search_title:
+            confidence = "HIGH"
+        else:
+            confidence = "MEDIUM"
+
+        return _track_result(track, confidence)
+
+    # Try fuzzy search (title only), which is only needed when the exact search found nothing
+    limiter.wait()
+    results = sp.search(q=title, type="track", limit=5)
+    tracks = results.get("tracks", {}).get("items", [])
 
+    artist_words = search_artist.split()
+    for track in tracks:
+        # Check if artist matches loosely
+        track_artists = " ".join(a["name"].lower() for a in track["artists"])
+        if artist_words and artist_words[0] in track_artists:
+            return _track_result(track, "LOW")
 
-def update_track_match(conn, track_id: int, spotify_id: str, confidence: str):
-    """Update scoring_track with Spotify match."""
+    return None
+
+
+def update_track_matches(conn, matched: list[dict]):
+    """Update scoring_tracks with their Spotify matches in one statement."""
+    if not matched:
+        return
     with conn.cursor() as cur:
-        cur.execute("""
+        execute_values(cur, """
             UPDATE scoring_tracks
-            SET spotify_track_id = %s, spotify_match_confidence = %s
-            WHERE id = %s
-        """, (spotify_id, confidence, track_id))
+            SET spotify_track_id = v.spotify_id, spotify_match_confidence = v.confidence
+            FROM (VALUES %s) AS v(spotify_id, confidence, id)
+            WHERE scoring_tracks.id = v.id
+        """, [(m["spotify_id"], m["confidence"], m["db_id"]) for m in matched],
+            page_size=len(matched))
     conn.commit()
 
 
-def mark_not_found(conn, track_id: int):
-    """Mark track as not found on Spotify."""
+def mark_not_found(conn, track_ids: list[int]):
+    """Mark tracks as not found on Spotify."""
+    if not track_ids:
+        return
     with conn.cursor() as cur:
         cur.execute("""
             UPDATE scoring_tracks
             SET spotify_match_confidence = 'NOT_FOUND'
-            WHERE id = %s
-        """, (track_id,))
+            WHERE id = ANY(%s)
+        """, (track_ids,))
     conn.commit()
 
 
-def add_to_playlist(sp, playlist_id: str, track_ids: list[str]):
-    """Add tracks to playlist."""
-    # Get existing tracks to avoid duplicates
-    existing = set()
-    offset = 0
-    while True:
-        results = sp.playlist_tracks(playlist_id, offset=offset, limit=100)
-        items = results.get("items", [])
-        if not items:
-            break
-        for item in items:
-            if item.get("track") and item["track"].get("id"):
-                existing.add(item["track"]["id"])
-        offset += len(items)
-        if len(items) < 100:
-            break
-
-    # Filter to new tracks only
-    new_tracks = [t for t in track_ids if t not in existing]
+def has_playlist_tables(conn) -> bool:
+    """Whether the playlist membership mirror exists (pipeline/migrations/002_playlist_membership.sql)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT to_regclass('playlist_tracks') IS NOT NULL
+               AND to_regclass('playlist_snapshots') IS NOT NULL AS exists
+        """)
+        return cur.fetchone()['exists']
+
+
+def record_playlist_tracks(
+    conn, playlist_id: str, snapshot_id: str, track_ids, replace: bool = False
+):
+    """Record tracks as in the playlist as of snapshot_id (replace: only these)."""
+    with conn.cursor() as cur:
+        if replace:
+            cur.execute("DELETE FROM playlist_tracks WHERE playlist_id = %s", (playlist_id,))
+        if track_ids:
+            execute_values(cur, """
+                INSERT INTO playlist_tracks (playlist_id, spotify_track_id) VALUES %s
+                ON CONFLICT DO NOTHING
+            """, [(playlist_id, t) for t in track_ids])
+        cur.execute("""
+            INSERT INTO playlist_snapshots (playlist_id, snapshot_id) VALUES (%s, %s)
+            ON CONFLICT (playlist_id) DO UPDATE SET snapshot_id = EXCLUDED.snapshot_id
+        """, (playlist_id, snapshot_id))
+    conn.commit()
+
+
+def mark_added_to_playlist(conn, spotify_ids: list[str]):
+    """Flag scoring_tracks as added, joining against the IDs COPYed into a temp table."""
+    with conn.cursor() as cur:
+        # A join lets the planner use an index on spotify_track_id, which a
+        # large = ANY(array) filter often can't
+        cur.execute("CREATE TEMP TABLE _added_ids (id TEXT) ON COMMIT DROP")
+        cur.copy_from(io.StringIO("\n".join(spotify_ids)), "_added_ids", columns=("id",))
+        cur.execute("""
+            UPDATE scoring_tracks s
+            SET added_to_playlist = true
+            FROM (SELECT DISTINCT id FROM _added_ids) i
+            WHERE s.spotify_track_id = i.id
+        """)
+    conn.commit()
+
+
+def _fetch_playlist_track_ids(sp, playlist_id: str, limiter: RateLimiter) -> set[str]:
+    """
+    Page through the whole playlist for its track IDs.
+
+    The first page reports the playlist's total, so the remaining pages are
+    fetched concurrently by offset (spotipy retries 429s after Retry-After).
+    """
+    def fetch_page(offset: int) -> dict:
+        limiter.wait()
+        return sp.playlist_tracks(playlist_id, offset=offset, limit=100)
+
+    first = fetch_page(0)
+    pages = [first.get("items", [])]
+    offsets = range(100, first.get("total", 0), 100)
+    if offsets:
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+            pages.extend(page.get("items", []) for page in executor.map(fetch_page, offsets))
+
+    return {
+        item["track"]["id"]
+        for items in pages
+        for item in items
+        if item.get("track") and item["track"].get("id")
+    }
+
+
+def sync_playlist_membership(sp, conn, playlist_id: str, limiter: RateLimiter):
+    """
+    Bring playlist_tracks up to date with the playlist. Costs one API call
+    unless the playlist's snapshot_id changed since it was recorded.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT snapshot_id FROM playlist_snapshots WHERE playlist_id = %s",
+            (playlist_id,),
+        )
+        row = cur.fetchone()
+    conn.commit()  # Don't hold a transaction open through the API calls
+
+    limiter.wait()
+    snapshot_id = sp.playlist(playlist_id, fields="snapshot_id")["snapshot_id"]
+    if row and row["snapshot_id"] == snapshot_id:
+        return
+
+    existing = _fetch_playlist_track_ids(sp, playlist_id, limiter)
+    record_playlist_tracks(conn, playlist_id, snapshot_id, existing, replace=True)
+
+
+def filter_new_tracks(conn, playlist_id: str, track_ids: list[str]) -> list[str]:
+    """Return track_ids not already in the playlist (deduplicated, order kept)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT t.id
+            FROM unnest(%s::text[]) WITH ORDINALITY AS t(id, n)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM playlist_tracks p
+                WHERE p.playlist_id = %s AND p.spotify_track_id = t.id
+            )
+            GROUP BY t.id
+            ORDER BY min(t.n)
+        """, (track_ids, playlist_id))
+        return [row["id"] for row in cur.fetchall()]
+
+
+def add_to_playlist(
+    sp, conn, playlist_id: str, track_ids: list[str], limiter: RateLimiter, record: bool
+):
+    """Add tracks to playlist.
+
+    With record, dedupes against (and updates) the membership mirrored in the
+    DB; otherwise against the fetched playlist, writing nothing to the DB.
+    """
+    if record:
+        # Dedupe against playlist membership in the DB rather than the whole playlist in memory
+        sync_playlist_membership(sp, conn, playlist_id, limiter)
+        new_tracks = filter_new_tracks(conn, playlist_id, track_ids)
+    else:
+        existing = _fetch_playlist_track_ids(sp, playlist_id, limiter)
+        new_tracks = [t for t in dict.fromkeys(track_ids) if t not in existing]
 
     if not new_tracks:
         print("All tracks already in playlist")
@@ -165,10 +429,13 @@ def add_to_playlist(sp, playlist_id: str, track_ids: list[str]):
     for i in range(0, len(new_tracks), 100):
         batch = new_tracks[i:i+100]
         uris = [f"spotify:track:{t}" for t in batch]
-        sp.playlist_add_items(playlist_id, uris)
+        limiter.wait()
+        snapshot_id = sp.playlist_add_items(playlist_id, uris)["snapshot_id"]
+        # Record each batch so our own additions don't force a full refetch next run
+        if record:
+            record_playlist_tracks(conn, playlist_id, snapshot_id, batch)
         added += len(batch)
         print(f"  Added batch: {len(batch)} tracks (total: {added})")
-        time.sleep(0.5)
 
     return added
 
@@ -183,14 +450,19 @@ def main():
 
     # Load env
     script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    load_dotenv(os.path.expanduser("~/DevKev/personal/spotify-bulk-actions-mcp/.env"))
-    load_dotenv(project_root / ".env.local")
+    load_config()
 
     conn = get_db_connection()
     sp = get_spotify_client()
+    cache = SearchCache(str(script_dir / SEARCH_CACHE_FILE))
+    limiter = RateLimiter()
 
     try:
+        if args.sync and args.execute and not has_playlist_tables(conn):
+            print("Error: playlist_tracks/playlist_snapshots tables not found.")
+            print("  Run once: psql \"$DATABASE_URL\" -f pipeline/migrations/002_playlist_membership.sql")
+            sys.exit(1)
+
         # Get unmatched tracks
         tracks = get_unmatched_tracks(conn, args.show_id)
         print(f"Found {len(tracks)} unmatched scoring tracks")
@@ -207,7 +479,7 @@ def main():
             artist = track["artist"]
             print(f"[{i}/{len(tracks)}] {artist} - {title}...", end=" ")
 
-            result = search_spotify(sp, title, artist)
+            result = search_spotify(sp, title, artist, limiter, cache)
 
             if result:
                 print(f"FOUND ({result['confidence']}): {result['name']}")
@@ -216,24 +488,22 @@ def main():
                     "spotify_id": result["id"],
                     "confidence": result["confidence"],
                 })
-
-                if args.execute:
-                    update_track_match(conn, track["id"], result["id"], result["confidence"])
             else:
                 print("NOT FOUND")
                 not_found.append(track)
 
-                if args.execute:
-                    mark_not_found(conn, track["id"])
-
-            time.sleep(0.2)  # Rate limiting
+        # Searches are cached, so writing once at the end loses nothing on a re-run
+        if args.execute:
+            update_track_matches(conn, matched)
+            mark_not_found(conn, [t["id"] for t in not_found])
 
         # Summary
         print(f"\n--- Summary ---")
         print(f"Matched: {len(matched)}")
-        print(f"  HIGH: {sum(1 for m in matched if m['confidence'] == 'HIGH')}")
-        print(f"  MEDIUM: {sum(1 for m in matched if m['confidence'] == 'MEDIUM')}")
-        print(f"  LOW: {sum(1 for m in matched if m['confidence'] == 'LOW')}")
+        counts = Counter(m["confidence"] for m in matched)
+        print(f"  HIGH: {counts['HIGH']}")
+        print(f"  MEDIUM: {counts['MEDIUM']}")
+        print(f"  LOW: {counts['LOW']}")
         print(f"Not found: {len(not_found)}")
 
         # Sync to playlist
@@ -242,21 +512,17 @@ def main():
             if playlist_id:
                 print(f"\nAdding {len(matched)} tracks to playlist...")
                 track_ids = [m["spotify_id"] for m in matched]
-                added = add_to_playlist(sp, playlist_id, track_ids)
+                # The DB membership mirror is only read and written with --execute
+                added = add_to_playlist(sp, conn, playlist_id, track_ids, limiter, record=args.execute)
                 print(f"Added {added} new tracks to playlist")
 
                 # Mark as added
                 if args.execute:
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            UPDATE scoring_tracks
-                            SET added_to_playlist = true
-                            WHERE spotify_track_id = ANY(%s)
-                        """, ([m["spotify_id"] for m in matched],))
-                    conn.commit()
+                    mark_added_to_playlist(conn, track_ids)
 
     finally:
         conn.close()
+        cache.close()
 
 
 if __name__ == "__main__":
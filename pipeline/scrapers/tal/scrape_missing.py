@@ -9,22 +9,57 @@ Usage:
     python tal_scrape_missing.py --limit 10          # Scrape first 10 missing
     python tal_scrape_missing.py --execute           # Scrape all missing
     python tal_scrape_missing.py --execute --skip-after 877  # Skip recent episodes
+    python tal_scrape_missing.py --execute --retry-failed    # Include episodes that just failed
 """
 
 import argparse
+import asyncio
 import json
 import os
+import random
 import re
 import sys
 import time
 from datetime import datetime
 from pathlib import Path
 
+import httpx
 import psycopg2
-import requests
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+# Optional: HTTP/2 lets the concurrent requests share one connection (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Optional: orjson decodes Firecrawl responses and writes the indented episode JSON several times faster
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+MAX_CONCURRENT = 5       # Firecrawl hobby tier limit
+SCRAPE_TIMEOUT = 60      # seconds per request
+DEFAULT_RPM = 120        # Firecrawl requests/minute to start at (FIRECRAWL_RPM overrides); adapts to 429s
+MIN_RPS = 0.2
+MAX_RPS = 10.0
+SPEEDUP_AFTER = 20       # Consecutive successes before raising the rate 10%
+MAX_RETRIES = 5          # Attempts per episode on 429/503 and network errors
+RETRY_BASE = 1.0         # Seconds; backoff is RETRY_BASE * 2**attempt plus jitter
+PROGRESS_FILE = ".scrape_progress.jsonl"  # Append-only log of scrape attempts, in the output dir
+RETRY_FAILED_AFTER = 3600  # Seconds before a failed episode is attempted again
+
+# Firecrawl reports the page's HTTP status as "statusCode" in the response metadata.
+# Quotes inside the markdown string are escaped, so this only matches that key.
+NOT_FOUND_RE = re.compile(rb'"statusCode"\s*:\s*404\b')
+NOT_FOUND_RESPONSE = {"success": True, "data": {"metadata": {"statusCode": 404}}}
+# Rows whose URL isn't a TAL episode page would only waste a Firecrawl call
+EPISODE_URL_RE = re.compile(r'^https?://(?:www\.)?thisamericanlife\.org/\d+/', re.ASCII)
+
 
 def get_db_connection():
     """Connect to Neon database."""
@@ -40,64 +75,162 @@ def get_missing_episodes(conn, json_dir: Path, skip_after_episode: int = None) -
     Args:
         conn: Database connection
         json_dir: Directory containing JSON files
-        skip_after_episode: Skip episodes with numbers > this value
+        skip_after_episode: Skip episodes with numbers > this value (None for no cutoff)
     """
-    # Get all TAL episodes
+    # Get existing JSON files; scandir yields names without building a Path per entry
+    existing_ids = []
+    with os.scandir(json_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                existing_ids.append(int(entry.name[:-len(".json")]))
+            except ValueError:
+                pass
+
+    # Anti-join and episode cutoff in SQL, so only missing rows come back.
+    # title is only printed, so it comes back already trimmed for display.
+    # Joining the unnested array (rather than id <> ALL(...)) lets Postgres
+    # hash the file IDs once instead of scanning the array for every episode.
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT id, episode_number, title, url
-            FROM episodes
-            WHERE show_id = 2 AND title IS NOT NULL
-            ORDER BY id
-        """)
-        episodes = cur.fetchall()
-
-    # Get existing JSON files
-    existing_ids = set(int(f.stem) for f in json_dir.glob("*.json"))
-
-    # Find missing
-    missing = []
-    for ep in episodes:
-        if ep['id'] not in existing_ids:
-            # Check skip_after filter
-            if skip_after_episode and ep['episode_number'] > skip_after_episode:
-                continue
-            missing.append(ep)
-
-    return missing
-
+            SELECT e.id, e.episode_number, LEFT(e.title, 40) AS title, e.url
+            FROM episodes e
+            LEFT JOIN unnest(%(existing)s::int[]) AS x(id) ON x.id = e.id
+            WHERE x.id IS NULL
+            AND e.show_id = 2 AND e.title IS NOT NULL
+            AND (%(skip_after)s::int IS NULL OR e.episode_number <= %(skip_after)s)
+            ORDER BY e.id
+        """, {"skip_after": skip_after_episode, "existing": existing_ids})
+        return cur.fetchall()
+
+
+def load_recent_failures(path: Path, within: float = RETRY_FAILED_AFTER) -> set[int]:
+    """IDs whose latest logged attempt failed less than `within` seconds ago."""
+    if not path.exists():
+        return set()
+    cutoff = time.time() - within
+    latest = {}
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line) if HAS_ORJSON else json.loads(line)
+            except ValueError:
+                continue  # Partial last line from a killed run
+            latest[entry["id"]] = entry
+    return {db_id for db_id, entry in latest.items()
+            if entry["status"] != "ok" and entry["ts"] > cutoff}
+
+
+def log_progress(progress_log, db_id: int, status: str) -> None:
+    """Append one attempt to the progress log (buffered; flushed when the log is closed)."""
+    entry = {"id": db_id, "status": status, "ts": time.time()}
+    progress_log.write((orjson.dumps(entry) if HAS_ORJSON else json.dumps(entry).encode()) + b"\n")
+
+
+class RateLimiter:
+    """
+    Adaptive request pacing shared by all concurrent scrapes.
 
-def scrape_url(url: str, api_key: str) -> dict | None:
-    """Scrape a URL using Firecrawl.
+    Starts at `rps` requests/second, halves the rate on every 429/503 and speeds
+    up 10% after each run of SPEEDUP_AFTER successes. Slots are reserved
+    without awaiting, so it needs no lock.
+    """
 
-    Returns the scraped data or None on error.
+    def __init__(self, rps: float = DEFAULT_RPM / 60):
+        self.rps = min(MAX_RPS, max(MIN_RPS, rps))
+        self._next_start = 0.0
+        self._successes = 0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rps
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def success(self) -> None:
+        self._successes += 1
+        if self._successes >= SPEEDUP_AFTER:
+            self._successes = 0
+            self.rps = min(MAX_RPS, self.rps * 1.1)
+
+    def throttled(self) -> None:
+        self._successes = 0
+        self.rps = max(MIN_RPS, self.rps / 2)
+
+
+def retry_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    """Seconds to wait before a retry: Retry-After when the server sent one, else backoff with jitter."""
+    if response is not None:
+        try:
+            return float(response.headers["Retry-After"]) + 1
+        except (KeyError, ValueError):
+            pass
+    return RETRY_BASE * 2 ** attempt + random.random()
+
+
+async def scrape_url(
+    client: httpx.AsyncClient,
+    url: str,
+    semaphore: asyncio.Semaphore,
+    limiter: RateLimiter,
+) -> tuple[dict | None, str | None]:
+    """Scrape a URL using Firecrawl, retrying rate limits and network errors.
+
+    Returns (scraped data, None), or (None, error message) on failure.
     """
     api_url = "https://api.firecrawl.dev/v1/scrape"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
     payload = {
         "url": url,
         "formats": ["markdown"],
         "onlyMainContent": True
     }
 
-    try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        data = response.json()
+    async with semaphore:
+        for attempt in range(MAX_RETRIES):
+            last_try = attempt == MAX_RETRIES - 1
+            await limiter.acquire()
+            try:
+                response = await client.post(api_url, json=payload, timeout=SCRAPE_TIMEOUT)
+            except httpx.TransportError as e:
+                error = "Timeout" if isinstance(e, httpx.TimeoutException) else str(e)
+                if last_try:
+                    return None, error
+                await asyncio.sleep(retry_delay(attempt))
+                continue
+
+            if response.status_code in (429, 503):
+                limiter.throttled()
+                if last_try:
+                    return None, f"HTTP {response.status_code}"
+                await asyncio.sleep(retry_delay(attempt, response))
+                continue
 
-        if data.get("success"):
-            return data.get("data", {})
-        return None
-    except Exception as e:
-        print(f"  Scrape error for {url}: {e}")
-        return None
+            try:
+                response.raise_for_status()
+                raw = response.content
+                # 404 pages are dropped by the caller, so skip decoding their markdown
+                if NOT_FOUND_RE.search(raw):
+                    data = NOT_FOUND_RESPONSE
+                else:
+                    # Scrape payloads carry the full markdown; orjson decodes the raw bytes directly
+                    data = orjson.loads(raw) if HAS_ORJSON else json.loads(raw)
+            except httpx.HTTPStatusError as e:
+                return None, f"HTTP {e.response.status_code}"
+            except ValueError as e:
+                return None, f"Invalid JSON: {e}"
+
+            limiter.success()
+            if data.get("success"):
+                return data.get("data", {}), None
+            return None, "Firecrawl reported failure"
+
+    return None, "Retries exhausted"
 
 
 def save_json(db_id: int, url: str, scraped_data: dict, output_dir: Path):
-    """Save scraped data to JSON file."""
+    """Save scraped data to JSON file, via a temp file so a killed run can't leave it truncated."""
     json_data = {
         "db_id": db_id,
         "url": url,
@@ -108,12 +241,77 @@ def save_json(db_id: int, url: str, scraped_data: dict, output_dir: Path):
     }
 
     filepath = output_dir / f"{db_id}.json"
-    with open(filepath, 'w') as f:
-        json.dump(json_data, f, indent=2)
+    # A half-written {db_id}.json would count as already fetched; the .part name never does
+    part_path = filepath.with_name(filepath.name + ".part")
+    if HAS_ORJSON:
+        part_path.write_bytes(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(part_path, 'w') as f:
+            json.dump(json_data, f, indent=2)
+    os.replace(part_path, filepath)
 
     return filepath
 
 
+async def scrape_all(
+    episodes: list[dict],
+    api_key: str,
+    output_dir: Path,
+    rpm: float,
+    progress_log,
+) -> tuple[int, int]:
+    """Scrape episodes concurrently, saving each as it completes. Returns (success, failed).
+
+    Every attempt's outcome is appended to progress_log so later runs can skip recent failures.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    limiter = RateLimiter(rpm / 60)
+    success = 0
+    failed = 0
+
+    async with httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {api_key}"},
+        http2=HAS_HTTP2,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENT,
+            max_keepalive_connections=MAX_CONCURRENT,
+            keepalive_expiry=60,
+        ),
+    ) as client:
+        async def run(ep: dict):
+            return ep, *await scrape_url(client, ep['url'], semaphore, limiter)
+
+        # The semaphore caps in-flight requests; report each episode as it finishes
+        tasks = [run(ep) for ep in episodes]
+        for i, next_done in enumerate(asyncio.as_completed(tasks), 1):
+            ep, scraped, error = await next_done
+            db_id = ep['id']
+            print(f"[{i}/{len(episodes)}] #{ep['episode_number']} - {ep['title']}...")
+
+            if not scraped:
+                print(f"  ❌ Scrape failed: {error}")
+                log_progress(progress_log, db_id, "failed")
+                failed += 1
+                continue
+
+            # Check if it's a 404
+            status = scraped.get("metadata", {}).get("statusCode", 200)
+            if status == 404:
+                print(f"  ❌ Page returned 404")
+                log_progress(progress_log, db_id, "not_found")
+                failed += 1
+                continue
+
+            # Save JSON off the event loop so in-flight requests keep moving
+            filepath = await asyncio.to_thread(save_json, db_id, ep['url'], scraped, output_dir)
+            print(f"  ✅ Saved to {filepath.name}")
+            log_progress(progress_log, db_id, "ok")
+
+            success += 1
+
+    return success, failed
+
+
 def main():
     parser = argparse.ArgumentParser(description="Scrape missing TAL episodes")
     parser.add_argument("--dry-run", action="store_true",
@@ -126,6 +324,8 @@ def main():
                         help="Output directory for JSON files")
     parser.add_argument("--skip-after", type=int, default=877,
                         help="Skip episodes after this number (default: 877)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Also retry episodes that failed within the last hour")
     args = parser.parse_args()
 
     # Load env
@@ -141,81 +341,66 @@ def main():
     output_dir = script_dir / args.dir
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Get missing episodes
+    # Get missing episodes. Only this query needs the database, so the
+    # connection is closed before the (long) scraping phase starts
     conn = get_db_connection()
     try:
         episodes = get_missing_episodes(conn, output_dir, args.skip_after)
-        print(f"Found {len(episodes)} episodes without JSON files")
-
-        if args.skip_after:
-            print(f"(Skipping episodes after #{args.skip_after})")
-
-        if args.limit:
-            episodes = episodes[:args.limit]
-            print(f"Processing first {args.limit} episodes")
-
-        if not args.execute:
-            print("\n--- DRY RUN (use --execute to scrape) ---\n")
-            print("Sample episodes to scrape:")
-            for ep in episodes[:10]:
-                print(f"  [{ep['id']}] #{ep['episode_number']} - {ep['title'][:50]}...")
-            if len(episodes) > 10:
-                print(f"  ... and {len(episodes) - 10} more")
-            return
-
-        # Execute scraping
-        print(f"\n--- SCRAPING {len(episodes)} EPISODES ---\n")
-
-        success = 0
-        failed = 0
-
-        for i, ep in enumerate(episodes, 1):
-            db_id = ep['id']
-            ep_num = ep['episode_number']
-            url = ep['url']
-            title = ep['title'][:40] if ep['title'] else 'Untitled'
-
-            print(f"[{i}/{len(episodes)}] #{ep_num} - {title}...")
-
-            # Scrape the page
-            scraped = scrape_url(url, api_key)
-
-            if not scraped:
-                print(f"  ❌ Scrape failed")
-                failed += 1
-                time.sleep(0.3)
-                continue
-
-            # Check if it's a 404
-            status = scraped.get("metadata", {}).get("statusCode", 200)
-            if status == 404:
-                print(f"  ❌ Page returned 404")
-                failed += 1
-                time.sleep(0.3)
-                continue
-
-            # Save JSON
-            filepath = save_json(db_id, url, scraped, output_dir)
-            print(f"  ✅ Saved to {filepath.name}")
-
-            success += 1
-
-            # Rate limiting
-            time.sleep(0.3)
-
-        print(f"\n--- Summary ---")
-        print(f"Success: {success}")
-        print(f"Failed: {failed}")
-
-        if success > 0:
-            print(f"\nNext steps:")
-            print(f"  1. Run: python tal_fill_songs.py --execute")
-            print(f"  2. Run: python spotify_match.py --show-id 2")
-            print(f"  3. Run: python sync_playlist.py --show-id 2")
-
     finally:
         conn.close()
 
+    print(f"Found {len(episodes)} episodes without JSON files")
+
+    if args.skip_after is not None:
+        print(f"(Skipping episodes after #{args.skip_after})")
+
+    # Malformed URLs (NULL, relative, other sites) are reported, not scraped
+    valid = [ep for ep in episodes if ep['url'] and EPISODE_URL_RE.match(ep['url'])]
+    if len(valid) < len(episodes):
+        print(f"(Skipping {len(episodes) - len(valid)} episodes without a valid TAL episode URL)")
+        episodes = valid
+
+    # Episodes that just failed would likely hit the same 404 or rate limit again
+    progress_path = output_dir / PROGRESS_FILE
+    if not args.retry_failed:
+        recently_failed = load_recent_failures(progress_path)
+        retryable = [ep for ep in episodes if ep['id'] not in recently_failed]
+        if len(retryable) < len(episodes):
+            print(f"(Skipping {len(episodes) - len(retryable)} episodes that failed in the last hour;"
+                  f" --retry-failed to include them)")
+            episodes = retryable
+
+    if args.limit:
+        episodes = episodes[:args.limit]
+        print(f"Processing first {args.limit} episodes")
+
+    if not args.execute:
+        print("\n--- DRY RUN (use --execute to scrape) ---\n")
+        print("Sample episodes to scrape:")
+        for ep in episodes[:10]:
+            print(f"  [{ep['id']}] #{ep['episode_number']} - {ep['title']}...")
+        if len(episodes) > 10:
+            print(f"  ... and {len(episodes) - 10} more")
+        return
+
+    # Execute scraping
+    print(f"\n--- SCRAPING {len(episodes)} EPISODES ---\n")
+
+    # Starting request rate for the account's Firecrawl plan
+    rpm = float(os.getenv("FIRECRAWL_RPM", DEFAULT_RPM))
+    with open(progress_path, 'ab', buffering=64 * 1024) as progress_log:
+        success, failed = asyncio.run(scrape_all(episodes, api_key, output_dir, rpm, progress_log))
+
+    print(f"\n--- Summary ---")
+    print(f"Success: {success}")
+    print(f"Failed: {failed}")
+
+    if success > 0:
+        print(f"\nNext steps:")
+        print(f"  1. Run: python tal_fill_songs.py --execute")
+        print(f"  2. Run: python spotify_match.py --show-id 2")
+        print(f"  3. Run: python sync_playlist.py --show-id 2")
+
 
 if __name__ == "__main__":
     main()
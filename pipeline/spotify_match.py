@@ -12,18 +12,25 @@ Usage:
 """
 
 import argparse
+import asyncio
+import bisect
+import json
 import os
+import sqlite3
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
 
+import httpx
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
-from spotipy.exceptions import SpotifyException
-from thefuzz import fuzz
+from rapidfuzz import fuzz, process
 from dotenv import load_dotenv
 
 # =============================================================================
@@ -31,13 +38,51 @@ from dotenv import load_dotenv
 # =============================================================================
 
 BATCH_SIZE = 50          # Songs per DB query
-API_DELAY = 0.3          # Seconds between Spotify API calls
+MAX_CONCURRENT = 8       # Parallel Spotify searches (429s are retried after Retry-After)
+INITIAL_RPS = 10.0       # Search rate to start at; adapts to 429 feedback
+MIN_RPS = 1.0
+MAX_RPS = 50.0
+SPEEDUP_AFTER = 100      # Consecutive successes before raising the rate 10%
 MAX_RETRIES = 3          # For rate limit handling
+SEARCH_URL = "https://api.spotify.com/v1/search"
 LOG_FILE = "match_progress.log"
+SEARCH_CACHE_FILE = ".spotify_search_cache.sqlite"
+SEARCH_CACHE_TTL = 30 * 24 * 3600  # Seconds; the Spotify catalog is stable
 
 # Confidence thresholds (same as MCP)
 HIGH_THRESHOLD = 0.90
 MEDIUM_THRESHOLD = 0.70
+# Ascending bin edges and the category for each bin
+CONFIDENCE_BINS = (MEDIUM_THRESHOLD, HIGH_THRESHOLD)
+CONFIDENCE_CATEGORIES = ("LOW", "MEDIUM", "HIGH")
+
+# Credentials and OAuth token cache are shared with spotify-bulk-actions-mcp
+MCP_DIR = os.path.expanduser("~/DevKev/personal/spotify-bulk-actions-mcp")
+MCP_ENV_FILE = os.path.join(MCP_DIR, ".env")
+SPOTIFY_TOKEN_CACHE = os.path.join(MCP_DIR, ".spotify_cache", ".cache")
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+@dataclass(frozen=True)
+class Config:
+    spotify_client_id: Optional[str]
+    spotify_client_secret: Optional[str]
+    spotify_redirect_uri: str
+    database_url: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def load_config() -> Config:
+    """Load the MCP's .env (once per process) and read the settings we use."""
+    load_dotenv(MCP_ENV_FILE)
+    return Config(
+        spotify_client_id=os.getenv("SPOTIFY_CLIENT_ID"),
+        spotify_client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
+        spotify_redirect_uri=os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8080/callback"),
+        database_url=os.getenv("NEON_DATABASE_URL"),
+    )
 
 # =============================================================================
 # Spotify Client
@@ -45,43 +90,127 @@ MEDIUM_THRESHOLD = 0.70
 
 def get_spotify_client() -> spotipy.Spotify:
     """Initialize Spotify client with OAuth."""
-    cache_path = os.path.expanduser(
-        "~/DevKev/personal/spotify-bulk-actions-mcp/.spotify_cache/.cache"
-    )
+    config = load_config()
 
     auth_manager = SpotifyOAuth(
-        client_id=os.getenv("SPOTIFY_CLIENT_ID"),
-        client_secret=os.getenv("SPOTIFY_CLIENT_SECRET"),
-        redirect_uri=os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8080/callback"),
+        client_id=config.spotify_client_id,
+        client_secret=config.spotify_client_secret,
+        redirect_uri=config.spotify_redirect_uri,
         scope="user-library-read",
-        cache_path=cache_path,
+        cache_path=SPOTIFY_TOKEN_CACHE,
     )
 
     return spotipy.Spotify(auth_manager=auth_manager)
 
 
-def search_with_retry(sp: spotipy.Spotify, query: str, retries: int = MAX_RETRIES) -> Optional[Dict]:
+class RateLimiter:
+    """
+    Adaptive request pacing shared by all concurrent searches.
+
+    Starts at `rps` requests/second, halves the rate on every 429 and speeds
+    up 10% after each run of SPEEDUP_AFTER successes. Slots are reserved
+    without awaiting, so it needs no lock and works across event loops.
+    """
+
+    def __init__(self, rps: float = INITIAL_RPS):
+        self.rps = rps
+        self._next_start = 0.0
+        self._successes = 0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rps
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def success(self) -> None:
+        self._successes += 1
+        if self._successes >= SPEEDUP_AFTER:
+            self._successes = 0
+            self.rps = min(MAX_RPS, self.rps * 1.1)
+
+    def throttled(self) -> None:
+        self._successes = 0
+        self.rps = max(MIN_RPS, self.rps / 2)
+
+
+async def search_with_retry(
+    client: httpx.AsyncClient,
+    query: str,
+    semaphore: asyncio.Semaphore,
+    limiter: RateLimiter,
+    retries: int = MAX_RETRIES,
+) -> Optional[Dict]:
     """Search Spotify with rate limit handling."""
-    for attempt in range(retries):
-        try:
-            result = sp.search(q=query, type="track", limit=3)
-            return result
-        except SpotifyException as e:
-            if e.http_status == 429:
-                retry_after = int(e.headers.get("Retry-After", 5)) + 1
-                print(f"  Rate limited. Waiting {retry_after}s...", file=sys.stderr)
-                time.sleep(retry_after)
-            else:
+    async with semaphore:
+        for attempt in range(retries):
+            await limiter.acquire()
+            try:
+                response = await client.get(SEARCH_URL, params={"q": query, "type": "track", "limit": 3})
+                if response.status_code == 429:
+                    limiter.throttled()
+                    retry_after = int(response.headers.get("Retry-After", 5)) + 1
+                    print(f"  Rate limited. Waiting {retry_after}s...", file=sys.stderr)
+                    await asyncio.sleep(retry_after)
+                    continue
+                response.raise_for_status()
+                limiter.success()
+                return response.json()
+            except httpx.HTTPStatusError as e:
                 print(f"  Spotify error: {e}", file=sys.stderr)
                 return None
-        except Exception as e:
-            print(f"  Network error: {e}", file=sys.stderr)
-            if attempt < retries - 1:
-                time.sleep(2)
-            else:
-                return None
+            except Exception as e:
+                print(f"  Network error: {e}", file=sys.stderr)
+                if attempt < retries - 1:
+                    await asyncio.sleep(2)
+                else:
+                    return None
     return None
 
+
+class SearchCache:
+    """
+    Persistent Spotify search responses, keyed by normalized (title, artist).
+
+    Lets re-runs (e.g. after a crash mid-batch) skip songs already searched.
+    Only successful responses are stored, so errors are retried next time.
+    """
+
+    def __init__(self, path: str, ttl: float = SEARCH_CACHE_TTL):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                title TEXT NOT NULL,
+                artist TEXT NOT NULL,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (title, artist)
+            )
+        """)
+
+    @staticmethod
+    def _key(title: str, artist: str) -> tuple:
+        return title.lower().strip(), artist.lower().strip()
+
+    def get(self, title: str, artist: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT response FROM searches WHERE title = ? AND artist = ? AND fetched_at > ?",
+            (*self._key(title, artist), time.time() - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, title: str, artist: str, response: Dict) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                (*self._key(title, artist), json.dumps(response), time.time()),
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
 # =============================================================================
 # Confidence Scoring (same algorithm as MCP)
 # =============================================================================
@@ -95,20 +224,34 @@ def calculate_match_confidence(
     """
     Calculate confidence score for a track match.
 
-    Uses thefuzz for string similarity.
+    Uses rapidfuzz for string similarity, rounded to whole percents like
+    thefuzz so scores (and thresholds) match the MCP.
     Title weight: 55%, Artist weight: 45%
 
     Returns: Float between 0 and 1
     """
-    # Title similarity
-    title_score = fuzz.ratio(query_title.lower(), result_title.lower()) / 100
+    return _score_match(query_title.lower(), query_artist.lower(), result_title, result_artists)
 
-    # Artist similarity (check against all artists on the track)
-    artist_scores = [
-        fuzz.ratio(query_artist.lower(), artist.lower()) / 100
-        for artist in result_artists
-    ]
-    artist_score = max(artist_scores) if artist_scores else 0
+
+def _score_match(
+    query_title: str,
+    query_artist: str,
+    result_title: str,
+    result_artists: List[str],
+) -> float:
+    """calculate_match_confidence for an already-lowercased query."""
+    # Title similarity
+    title_score = round(fuzz.ratio(query_title, result_title.lower())) / 100
+
+    # Artist similarity (check against all artists on the track, in one C call)
+    artist_score = 0
+    if result_artists:
+        artist_scores = process.cdist(
+            [query_artist],
+            [artist.lower() for artist in result_artists],
+            scorer=fuzz.ratio,
+        )
+        artist_score = round(float(artist_scores.max())) / 100
 
     # Weighted average
     confidence = (title_score * 0.55) + (artist_score * 0.45)
@@ -118,12 +261,7 @@ def calculate_match_confidence(
 
 def get_confidence_category(confidence: float) -> str:
     """Categorize confidence score."""
-    if confidence >= HIGH_THRESHOLD:
-        return "HIGH"
-    elif confidence >= MEDIUM_THRESHOLD:
-        return "MEDIUM"
-    else:
-        return "LOW"
+    return CONFIDENCE_CATEGORIES[bisect.bisect_right(CONFIDENCE_BINS, confidence)]
 
 # =============================================================================
 # Database Operations
@@ -131,7 +269,7 @@ def get_confidence_category(confidence: float) -> str:
 
 def get_db_connection() -> psycopg2.extensions.connection:
     """Get Neon database connection."""
-    db_url = os.getenv("NEON_DATABASE_URL")
+    db_url = load_config().database_url
     if not db_url:
         raise RuntimeError("NEON_DATABASE_URL not set in environment")
 
@@ -142,16 +280,23 @@ def fetch_unmatched_songs(
     conn: psycopg2.extensions.connection,
     show_id: Optional[int],
     limit: int,
+    after_id: int = 0,
 ) -> List[Dict]:
-    """Query songs that haven't been matched yet."""
+    """
+    Query songs that haven't been matched yet, in id order.
+
+    after_id skips songs up to and including that id, so the next batch can
+    be fetched before the current one's results are saved.
+    """
     query = """
         SELECT s.id, s.title, s.artist
         FROM songs s
         JOIN episodes e ON s.episode_id = e.id
         WHERE s.spotify_track_id IS NULL
           AND s.spotify_match_confidence IS NULL
+          AND s.id > %s
     """
-    params = []
+    params = [after_id]
 
     if show_id:
         query += " AND e.show_id = %s"
@@ -160,9 +305,14 @@ def fetch_unmatched_songs(
     query += " ORDER BY s.id LIMIT %s"
     params.append(limit)
 
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    # Plain tuple rows, so each song is built into a dict once rather than
+    # copied out of a RealDictRow
+    with conn.cursor() as cur:
         cur.execute(query, params)
-        return [dict(row) for row in cur.fetchall()]
+        return [
+            {"id": song_id, "title": title, "artist": artist}
+            for song_id, title, artist in cur.fetchall()
+        ]
 
 
 def save_results(
@@ -170,21 +320,11 @@ def save_results(
     matched: List[Dict],
     not_found: List[int],
 ) -> None:
-    """Save match results to database."""
+    """Save match results to database (one statement per kind of result)."""
     with conn.cursor() as cur:
-        # Update matched songs
-        for match in matched:
-            cur.execute("""
-                UPDATE songs SET
-                    spotify_track_id = %s,
-                    spotify_match_confidence = %s,
-                    album = %s,
-                    spotify_web_url = %s,
-                    spotify_popularity = %s,
-                    spotify_title = %s,
-                    spotify_artist = %s
-                WHERE id = %s
-            """, (
+        # Update matched songs from a VALUES list
+        if matched:
+            rows = [(
                 match["track_id"],
                 match["confidence_category"],
                 match["album"],
@@ -193,14 +333,33 @@ def save_results(
                 match["spotify_title"],
                 match["spotify_artist"],
                 match["song_id"],
-            ))
+            ) for match in matched]
+            execute_values(cur, """
+                UPDATE songs SET
+                    spotify_track_id = v.track_id,
+                    spotify_match_confidence = v.confidence,
+                    album = v.album,
+                    spotify_web_url = v.web_url,
+                    spotify_popularity = v.popularity,
+                    spotify_title = v.spotify_title,
+                    spotify_artist = v.spotify_artist
+                FROM (VALUES %s) AS v(
+                    track_id, confidence, album, web_url,
+                    popularity, spotify_title, spotify_artist, id
+                )
+                WHERE songs.id = v.id
+            """, rows,
+                # An all-NULL VALUES column would be typed text; keep popularity integer
+                template="(%s, %s, %s, %s, %s::integer, %s, %s, %s)",
+                page_size=len(rows),
+            )
 
         # Mark NOT_FOUND songs
-        for song_id in not_found:
+        if not_found:
             cur.execute("""
                 UPDATE songs SET spotify_match_confidence = 'NOT_FOUND'
-                WHERE id = %s
-            """, (song_id,))
+                WHERE id = ANY(%s)
+            """, (not_found,))
 
     conn.commit()
 
@@ -208,45 +367,87 @@ def save_results(
 # Matching Logic
 # =============================================================================
 
-def search_and_score(
-    sp: spotipy.Spotify,
+async def search_and_score(
+    client: httpx.AsyncClient,
     title: str,
     artist: str,
+    semaphore: asyncio.Semaphore,
+    limiter: RateLimiter,
+    cache: SearchCache,
 ) -> Optional[Dict]:
-    """Search Spotify and return best match with score."""
-    query = f'track:"{title}" artist:"{artist}"'
-    result = search_with_retry(sp, query)
+    """Search Spotify (or the search cache) and return best match with score."""
+    result = cache.get(title, artist)
+    if result is None:
+        query = f'track:"{title}" artist:"{artist}"'
+        result = await search_with_retry(client, query, semaphore, limiter)
+        if result is not None:
+            cache.set(title, artist, result)
 
     if not result or not result["tracks"]["items"]:
         return None
 
     # Score all results and pick the best
-    best_match = None
+    best_track = None
+    best_artists = None
     best_confidence = 0
 
+    # Lowercase the query once rather than per candidate
+    query_title, query_artist = title.lower(), artist.lower()
+
     for track in result["tracks"]["items"]:
         artists = [a["name"] for a in track["artists"]]
-        confidence = calculate_match_confidence(title, artist, track["name"], artists)
+        confidence = _score_match(query_title, query_artist, track["name"], artists)
 
         if confidence > best_confidence:
-            best_confidence = confidence
-            best_match = {
-                "track_id": track["id"],
-                "confidence": confidence,
-                "confidence_category": get_confidence_category(confidence),
-                "album": track["album"]["name"],
-                "web_url": f"https://open.spotify.com/track/{track['id']}",
-                "popularity": track.get("popularity", 0),
-                "spotify_title": track["name"],
-                "spotify_artist": ", ".join(artists),
-            }
+            best_track, best_artists, best_confidence = track, artists, confidence
+
+    if best_track is None:
+        return None
+
+    return {
+        "track_id": best_track["id"],
+        "confidence": best_confidence,
+        "confidence_category": get_confidence_category(best_confidence),
+        "album": best_track["album"]["name"],
+        "web_url": f"https://open.spotify.com/track/{best_track['id']}",
+        "popularity": best_track.get("popularity", 0),
+        "spotify_title": best_track["name"],
+        "spotify_artist": ", ".join(best_artists),
+    }
 
-    return best_match
+
+async def search_songs(
+    token: str,
+    songs: List[Dict],
+    limiter: RateLimiter,
+    cache: SearchCache,
+) -> List[Any]:
+    """
+    Search Spotify for all songs concurrently.
+
+    Returns one entry per song, in order: the best match, None if not found
+    (or the title is empty), or the exception the search raised.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+
+    async with httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=30,
+    ) as client:
+        async def search(song: Dict) -> Optional[Dict]:
+            if not song["title"]:
+                return None
+            return await search_and_score(client, song["title"], song["artist"] or "",
+                                          semaphore, limiter, cache)
+
+        return await asyncio.gather(*(search(song) for song in songs), return_exceptions=True)
 
 
 def match_songs_batch(
     sp: spotipy.Spotify,
     songs: List[Dict],
+    limiter: RateLimiter,
+    cache: SearchCache,
 ) -> Dict[str, Any]:
     """Search Spotify for each song, return categorized results."""
     results = {
@@ -256,7 +457,12 @@ def match_songs_batch(
         "not_found": [],
     }
 
-    for i, song in enumerate(songs):
+    # Searches go straight to the Web API concurrently; spotipy just supplies
+    # (and refreshes) the OAuth token
+    token = sp.auth_manager.get_access_token(as_dict=False)
+    matches = asyncio.run(search_songs(token, songs, limiter, cache))
+
+    for i, (song, match) in enumerate(zip(songs, matches)):
         title = song["title"] or ""
         artist = song["artist"] or ""
 
@@ -268,7 +474,8 @@ def match_songs_batch(
         print(f"  [{i+1}/{len(songs)}] Searching: {title[:40]} - {artist[:20]}...", end="")
 
         try:
-            match = search_and_score(sp, title, artist)
+            if isinstance(match, Exception):
+                raise match
 
             if match:
                 match["song_id"] = song["id"]
@@ -283,8 +490,6 @@ def match_songs_batch(
             print(f" ERROR: {e}")
             results["not_found"].append(song["id"])
 
-        time.sleep(API_DELAY)
-
     return results
 
 # =============================================================================
@@ -358,8 +563,7 @@ def main():
     args = parse_args()
 
     # Load environment from MCP's .env
-    env_path = os.path.expanduser("~/DevKev/personal/spotify-bulk-actions-mcp/.env")
-    load_dotenv(env_path)
+    load_config()
 
     print("=" * 50)
     print("Spotify Song Matching Script")
@@ -370,37 +574,48 @@ def main():
     try:
         sp = get_spotify_client()
         conn = get_db_connection()
+        # Separate connection for prefetching batches from a worker thread
+        fetch_conn = get_db_connection()
+        fetch_conn.set_session(readonly=True, autocommit=True)
         print("  Spotify: Connected")
         print("  Neon: Connected")
     except Exception as e:
         print(f"\nCRITICAL: Failed to initialize: {e}")
         sys.exit(1)
 
-    # Count unmatched songs
-    count_query = """
-        SELECT COUNT(*) FROM songs s
-        JOIN episodes e ON s.episode_id = e.id
-        WHERE s.spotify_track_id IS NULL
-          AND s.spotify_match_confidence IS NULL
-    """
-    if args.show_id:
-        count_query += f" AND e.show_id = {args.show_id}"
-
-    with conn.cursor() as cur:
-        cur.execute(count_query)
-        total_unmatched = cur.fetchone()[0]
+    cache = SearchCache(os.path.join(os.path.dirname(__file__), SEARCH_CACHE_FILE))
+    limiter = RateLimiter()  # Shared across batches so the learned rate carries over
 
-    # Calculate batches
-    limit = args.limit or total_unmatched
-    to_process = min(limit, total_unmatched)
-    num_batches = (to_process + BATCH_SIZE - 1) // BATCH_SIZE
+    # Count unmatched songs (a full scan of the backlog, so only when --limit
+    # doesn't already say how many to process)
+    if args.limit:
+        to_process = args.limit
+        print(f"\nProcessing up to {to_process} unmatched songs", end="")
+    else:
+        count_query = """
+            SELECT COUNT(*) FROM songs s
+            JOIN episodes e ON s.episode_id = e.id
+            WHERE s.spotify_track_id IS NULL
+              AND s.spotify_match_confidence IS NULL
+        """
+        params = []
+        if args.show_id:
+            count_query += " AND e.show_id = %s"
+            params.append(args.show_id)
+
+        with conn.cursor() as cur:
+            cur.execute(count_query, params)
+            to_process = cur.fetchone()[0]
+        print(f"\nFound {to_process} unmatched songs", end="")
 
-    print(f"\nFound {total_unmatched} unmatched songs", end="")
     if args.show_id:
         print(f" (show_id={args.show_id})")
     else:
         print(" (all shows)")
 
+    # Calculate batches
+    num_batches = (to_process + BATCH_SIZE - 1) // BATCH_SIZE
+
     print(f"Will process {to_process} songs in {num_batches} batches of {BATCH_SIZE}")
 
     if args.dry_run:
@@ -420,25 +635,36 @@ def main():
     processed = 0
     batch_num = 0
 
+    # The next batch is fetched while the current one is searched on Spotify
+    executor = ThreadPoolExecutor(max_workers=1)
+    next_songs = executor.submit(
+        fetch_unmatched_songs, fetch_conn, args.show_id, min(BATCH_SIZE, to_process)
+    )
+
     try:
         while processed < to_process:
             batch_num += 1
-            remaining = to_process - processed
-            batch_limit = min(BATCH_SIZE, remaining)
 
             # Fetch songs
-            songs = fetch_unmatched_songs(conn, args.show_id, batch_limit)
+            songs = next_songs.result()
             if not songs:
                 print("\nNo more unmatched songs found.")
                 break
 
+            remaining = to_process - processed - len(songs)
+            if remaining > 0:
+                next_songs = executor.submit(
+                    fetch_unmatched_songs, fetch_conn, args.show_id,
+                    min(BATCH_SIZE, remaining), songs[-1]["id"],
+                )
+
             song_ids = [s["id"] for s in songs]
             song_range = f"{min(song_ids)}-{max(song_ids)}"
 
             print(f"\n--- Batch {batch_num} (songs {song_range}) ---")
 
             # Match songs
-            results = match_songs_batch(sp, songs)
+            results = match_songs_batch(sp, songs, limiter, cache)
 
             # Save results (unless dry run)
             if not args.dry_run:
@@ -465,7 +691,10 @@ def main():
         print("Progress up to last batch has been saved.")
         raise
     finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        fetch_conn.close()
         conn.close()
+        cache.close()
 
     # Final summary
     print_summary(total_results)
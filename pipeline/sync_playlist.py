@@ -141,77 +141,59 @@ def get_db_connection():
     )
 
 
-def get_matched_track_ids(show_id: int) -> List[str]:
+def get_matched_track_ids(conn, show_id: int) -> List[str]:
     """Query all matched track IDs for a show."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT DISTINCT spotify_track_id
-                FROM songs s
-                JOIN episodes e ON s.episode_id = e.id
-                WHERE e.show_id = %s
-                  AND spotify_track_id IS NOT NULL
-                  AND spotify_match_confidence IN ('HIGH', 'MEDIUM', 'MANUAL')
-                ORDER BY spotify_track_id
-            """, (show_id,))
-            return [row["spotify_track_id"] for row in cur.fetchall()]
-    finally:
-        conn.close()
-
-
-def get_latest_episode(show_id: int) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT spotify_track_id
+            FROM songs s
+            JOIN episodes e ON s.episode_id = e.id
+            WHERE e.show_id = %s
+              AND spotify_track_id IS NOT NULL
+              AND spotify_match_confidence IN ('HIGH', 'MEDIUM', 'MANUAL')
+            ORDER BY spotify_track_id
+        """, (show_id,))
+        return [row["spotify_track_id"] for row in cur.fetchall()]
+
+
+def get_latest_episode(conn, show_id: int) -> dict:
     """Get the most recent scraped episode for a show."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT title, episode_number, publish_date
-                FROM episodes
-                WHERE show_id = %s AND scraped_at IS NOT NULL
-                ORDER BY publish_date DESC
-                LIMIT 1
-            """, (show_id,))
-            row = cur.fetchone()
-            return dict(row) if row else None
-    finally:
-        conn.close()
-
-
-def get_playlist_stats(show_id: int) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT title, episode_number, publish_date
+            FROM episodes
+            WHERE show_id = %s AND scraped_at IS NOT NULL
+            ORDER BY publish_date DESC
+            LIMIT 1
+        """, (show_id,))
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+
+def get_playlist_stats(conn, show_id: int) -> dict:
     """Get song and episode counts for a show."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            # Count matched songs
-            cur.execute("""
-                SELECT COUNT(DISTINCT spotify_track_id) as songs
-                FROM songs s
-                JOIN episodes e ON s.episode_id = e.id
-                WHERE e.show_id = %s
-                  AND spotify_track_id IS NOT NULL
-                  AND spotify_match_confidence IN ('HIGH', 'MEDIUM', 'MANUAL')
-            """, (show_id,))
-            songs = cur.fetchone()["songs"]
-
-            # Count scraped episodes
-            cur.execute("""
-                SELECT COUNT(*) as episodes
-                FROM episodes
-                WHERE show_id = %s AND scraped_at IS NOT NULL
-            """, (show_id,))
-            episodes = cur.fetchone()["episodes"]
-
-            return {"songs": songs, "episodes": episodes}
-    finally:
-        conn.close()
-
-
-def update_playlist_description(sp: spotipy.Spotify, playlist_id: str, show_id: int):
+    with conn.cursor() as cur:
+        # Matched songs and scraped episodes, counted in one round trip
+        cur.execute("""
+            SELECT
+                (SELECT COUNT(DISTINCT spotify_track_id)
+                 FROM songs s
+                 JOIN episodes e ON s.episode_id = e.id
+                 WHERE e.show_id = %(show_id)s
+                   AND spotify_track_id IS NOT NULL
+                   AND spotify_match_confidence IN ('HIGH', 'MEDIUM', 'MANUAL')) AS songs,
+                (SELECT COUNT(*)
+                 FROM episodes
+                 WHERE show_id = %(show_id)s AND scraped_at IS NOT NULL) AS episodes
+        """, {"show_id": show_id})
+        return dict(cur.fetchone())
+
+
+def update_playlist_description(sp: spotipy.Spotify, conn, playlist_id: str, show_id: int):
     """Update playlist description with stats and date."""
     from datetime import datetime
 
-    stats = get_playlist_stats(show_id)
+    stats = get_playlist_stats(conn, show_id)
     date_str = datetime.now().strftime("%m/%y")
     acronym = SHOWS[show_id]["acronym"]
 
@@ -258,40 +240,47 @@ def main():
     playlist_id = show["playlist_id"]
     print(f"Syncing '{show['name']}' to playlist {playlist_id}")
 
-    # Get matched tracks from database
-    print("Querying matched tracks from database...")
-    db_tracks = get_matched_track_ids(args.show_id)
-    print(f"  Found {len(db_tracks)} unique matched tracks")
-
-    if not db_tracks:
-        print("No tracks to sync.")
-        return
-
-    # Get current playlist tracks
-    print("Fetching current playlist tracks...")
-    sp = get_spotify_client()
-    existing_tracks = get_playlist_tracks(sp, playlist_id)
-    print(f"  Playlist has {len(existing_tracks)} tracks")
-
-    # Find tracks to add
-    new_tracks = [t for t in db_tracks if t not in existing_tracks]
-    print(f"  {len(new_tracks)} new tracks to add")
-
-    if not new_tracks:
-        print("Playlist is already up to date!")
-        return
-
-    if args.dry_run:
-        print(f"\nDry run - would add {len(new_tracks)} tracks")
-        return
-
-    # Add new tracks
-    print(f"\nAdding {len(new_tracks)} tracks...")
-    added = add_tracks_to_playlist(sp, playlist_id, new_tracks)
-    print(f"\nDone! Added {added} tracks to playlist.")
-
-    # Update playlist description with latest episode
-    update_playlist_description(sp, playlist_id, args.show_id)
+    # One connection for every query in the run; autocommit so no transaction
+    # sits open while the Spotify calls run
+    conn = get_db_connection()
+    conn.set_session(readonly=True, autocommit=True)
+    try:
+        # Get matched tracks from database
+        print("Querying matched tracks from database...")
+        db_tracks = get_matched_track_ids(conn, args.show_id)
+        print(f"  Found {len(db_tracks)} unique matched tracks")
+
+        if not db_tracks:
+            print("No tracks to sync.")
+            return
+
+        # Get current playlist tracks
+        print("Fetching current playlist tracks...")
+        sp = get_spotify_client()
+        existing_tracks = get_playlist_tracks(sp, playlist_id)
+        print(f"  Playlist has {len(existing_tracks)} tracks")
+
+        # Find tracks to add
+        new_tracks = [t for t in db_tracks if t not in existing_tracks]
+        print(f"  {len(new_tracks)} new tracks to add")
+
+        if not new_tracks:
+            print("Playlist is already up to date!")
+            return
+
+        if args.dry_run:
+            print(f"\nDry run - would add {len(new_tracks)} tracks")
+            return
+
+        # Add new tracks
+        print(f"\nAdding {len(new_tracks)} tracks...")
+        added = add_tracks_to_playlist(sp, playlist_id, new_tracks)
+        print(f"\nDone! Added {added} tracks to playlist.")
+
+        # Update playlist description with latest episode
+        update_playlist_description(sp, conn, playlist_id, args.show_id)
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":